@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+"""
+Benchmarks for the IRefIndex adapter on a synthetic MITAB 2.6 file.
+
+Usage:
+    python benchmark.py [number_of_rows] [path_of_synthetic_file]
+    python benchmark.py [number_of_rows] [path_of_synthetic_file] shards
+
+The synthetic file mimics the All organisms file of IRefIndex: 54 tab
+separated columns per row, with realistic values in the columns used by the
+adapter and filler text in the other columns. It is only written if it does
+not exist yet.
+
+With "shards", only the neo4j import of the file is timed with 1, 2, 4, ...
+shards, up to the number of available CPUs. It writes to biocypher-benchmark
+with the ontology of the tests, so it runs offline.
+"""
+import os
+import random
+import re
+import sys
+import shutil
+import tracemalloc
+from functools import partial
+from time import perf_counter
+import yaml
+from biocypher import BioCypher
+from biocypher._logger import logger
+from template_package.adapters.neo4j_import import available_cpus
+from template_package.adapters.IRefIndex_adapter import (
+    ColumnarInteractionTable,
+    IRefIndexAdapter,
+    Interaction,
+    InteractionStore,
+    extract_mitab_fields,
+    parse_mitab_lines,
+    read_mitab,
+    split_mitab_columns,
+)
+
+MITAB_NUMBER_OF_COLUMNS = 54
+
+TAXA = ["9606", "10090", "559292", "562", "10116", "4932", "7227", "6239"]
+
+METHODS = [
+    "two hybrid",
+    "anti bait coimmunoprecipitation",
+    "pull down",
+    "x-ray crystallography",
+    "affinity chromatography technology",
+]
+
+PREFIXES = ["uniprotkb", "refseq", "entrezgene/locuslink", "complex", "pdb"]
+
+
+def write_synthetic_mitab(path, number_of_rows, seed=0):
+    """
+    Write a synthetic IRefIndex MITAB file with `number_of_rows` rows.
+    """
+    rng = random.Random(seed)
+    proteins = [f"P{i:05d}" for i in range(number_of_rows // 10 + 1)]
+
+    with open(path, "w") as file:
+        file.write(
+            "#" + "\t".join(f"column{i}" for i in range(MITAB_NUMBER_OF_COLUMNS)) + "\n"
+        )
+        for row in range(number_of_rows):
+            columns = ["-"] * MITAB_NUMBER_OF_COLUMNS
+            # filler for the alternative identifiers and aliases
+            for i in (2, 3, 4, 5):
+                columns[i] = "|".join(
+                    f"db:{rng.randint(0, 10**8)}" for _ in range(rng.randint(1, 15))
+                )
+            taxon_a = rng.choice(TAXA)
+            taxon_b = taxon_a if rng.random() < 0.9 else rng.choice(TAXA)
+            columns[6] = f'psi-mi:"MI:{rng.randint(1, 999):04d}"({rng.choice(METHODS)})'
+            columns[8] = f"pubmed:{rng.randint(1, 4 * 10**7)}"
+            columns[9] = f"taxid:{taxon_a}(organism {taxon_a})"
+            columns[10] = f"taxid:{taxon_b}(organism {taxon_b})"
+            columns[13] = f"rigid:{rng.getrandbits(160):040x}|edgetype:X|irigid:{row}"
+            columns[14] = "lpr:2|hpr:2|np:1"
+            columns[38] = f"{rng.choice(PREFIXES)}:{rng.choice(proteins)}"
+            columns[39] = f"{rng.choice(PREFIXES)}:{rng.choice(proteins)}"
+            file.write("\t".join(columns) + "\n")
+
+
+def run(name, function, lines, repeat=5):
+    """
+    Time `function` over all `lines` and log the throughput, the best of
+    `repeat` runs, as single runs vary by tens of percent.
+    """
+    best = None
+    for _ in range(repeat):
+        t0 = perf_counter()
+        for line in lines:
+            function(line)
+        duration = perf_counter() - t0
+        best = duration if best is None else min(best, duration)
+    logger.info(f"{name}: {round(best, 2)} s, {round(len(lines) / best)} lines/s")
+    return best
+
+
+def split_all_columns(line):
+    line = line.split("\t")
+    return line[6], line[8], line[9], line[10], line[13], line[38], line[39]
+
+
+def benchmark_tokenizer(lines):
+    logger.info("Tokenizer: split all columns vs split_mitab_columns")
+    before = run("split all columns", split_all_columns, lines)
+    after = run("split_mitab_columns", split_mitab_columns, lines)
+    logger.info(f"Speedup: {round(before / after, 2)}x")
+
+
+def extract_fields_with_re_search(line):
+    """
+    Field extraction as it was done before `extract_mitab_fields`: split all
+    columns and run `re.search` with string patterns.
+    """
+    line = line.split("\t")
+    input_partner_a = line[38]
+    input_partner_b = line[39]
+    for prefix in ("complex:", "pdb:", "flybase:"):
+        if input_partner_a.startswith(prefix) or input_partner_b.startswith(prefix):
+            return None
+
+    parts = input_partner_a.split(":")
+    partner_a = parts[1] if len(parts) > 1 else ""
+    parts = input_partner_b.split(":")
+    partner_b = parts[1] if len(parts) > 1 else ""
+
+    pmid = line[8].split("|")[-1].split(":")[-1]
+
+    match = re.search(r"\((.*?)\)", line[6])
+    method = match.group(1) if match else ""
+    match = re.search(r"taxid:(\d+)", line[9])
+    taxon_a = match.group(1) if match else ""
+    match = re.search(r"taxid:(\d+)", line[10])
+    taxon_b = match.group(1) if match else ""
+    match = re.search(r"rigid:([^|]+)", line[13])
+    relationship_id = match.group(1) if match else ""
+
+    return partner_a, partner_b, pmid, method, taxon_a, taxon_b, relationship_id
+
+
+def extract_taxon_with_re_search(line, taxa):
+    """
+    `extract_fields_with_re_search` with the taxa filter applied after all
+    fields are extracted, as it was before `extract_mitab_fields`.
+    """
+    fields = extract_fields_with_re_search(line)
+    if fields is None or fields[4] != fields[5] or fields[4] not in taxa:
+        return None
+    return fields
+
+
+def benchmark_field_extraction(lines, taxon="9606"):
+    logger.info("Field extraction: re.search vs extract_mitab_fields")
+    for line in lines:
+        assert extract_fields_with_re_search(line) == extract_mitab_fields(line)
+    before = run("re.search", extract_fields_with_re_search, lines)
+    after = run("extract_mitab_fields", extract_mitab_fields, lines)
+    logger.info(f"Speedup: {round(before / after, 2)}x")
+
+    logger.info(f"Field extraction of taxon {taxon}")
+    taxa = frozenset((taxon,))
+    before = run("re.search", partial(extract_taxon_with_re_search, taxa=taxa), lines)
+    after = run("extract_mitab_fields", partial(extract_mitab_fields, taxa=taxa), lines)
+    logger.info(f"Speedup: {round(before / after, 2)}x")
+
+
+def parse_into_dict(lines):
+    """
+    Interactions table as it was stored before `InteractionStore`: a dict of
+    `Interaction` objects holding one set per attribute.
+    """
+    interactions = {}
+    for line in lines:
+        fields = extract_mitab_fields(line)
+        if fields is None:
+            continue
+        partner_a, partner_b, pmid, method, taxon_a, taxon_b, relationship_id = fields
+        if (partner_a, partner_b) not in interactions:
+            interactions[(partner_a, partner_b)] = Interaction(
+                partner_a, partner_b, set(), set(), set(), set(), {"*"}, set()
+            )
+        interaction = interactions[(partner_a, partner_b)]
+        for values, value in (
+            (interaction.pmid, pmid),
+            (interaction.method, method),
+            (interaction.taxon_a, taxon_a),
+            (interaction.taxon_b, taxon_b),
+            (interaction.relationship_id, relationship_id),
+        ):
+            if value != "":
+                values.add(value)
+    return interactions
+
+
+def measure_memory(name, function, lines):
+    """
+    Build an interactions table with `function` and log the memory it holds
+    once it is parsed and grouped, and the peak memory while building it.
+    """
+    tracemalloc.start()
+    table = function(lines)
+    # a columnar table groups its rows on the first read, its grouped arrays
+    # are part of the memory it holds
+    number_of_interactions = len(table)
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    logger.info(
+        f"{name}: {number_of_interactions} interactions, {round(size / 2**20, 1)} MiB "
+        f"(peak {round(peak / 2**20, 1)} MiB)"
+    )
+    return size, table
+
+
+def benchmark_memory(lines):
+    logger.info("Interactions table memory: dict of sets vs InteractionStore")
+    before, table = measure_memory("dict of sets", parse_into_dict, lines)
+    after, store = measure_memory(
+        "InteractionStore", lambda lines: parse_mitab_lines(lines, "*")["*"], lines
+    )
+    assert dict(table.items()) == dict(store.items())
+    logger.info(f"Reduction: {round(before / after, 2)}x")
+
+
+def benchmark_columnar(lines):
+    """
+    Time and memory of both engines, measured at the same end state: the
+    rows parsed and grouped per pair.
+    """
+    logger.info("Columnar engine: InteractionStore vs ColumnarInteractionTable")
+    for reciprocal in (False, True):
+        results = []
+        for name, table in (
+            ("InteractionStore", InteractionStore),
+            ("ColumnarInteractionTable", ColumnarInteractionTable),
+        ):
+            t0 = perf_counter()
+            size, interactions = measure_memory(
+                f"{name} (reciprocal={reciprocal})",
+                lambda lines: parse_mitab_lines(
+                    lines, "*", table=partial(table, reciprocal=reciprocal)
+                )["*"],
+                lines,
+            )
+            results.append(list(interactions.items()))
+            logger.info(f"{name}: {round(perf_counter() - t0, 2)} s")
+        assert results[0] == results[1]
+
+
+def create_offline_biocypher(output_directory):
+    """
+    BioCypher instance with the configuration of the project and the local
+    ontology of the tests.
+    """
+    with open(os.path.join("config", "biocypher_config.yaml")) as file:
+        config = yaml.safe_load(file)
+    config["biocypher"]["head_ontology"] = {
+        "url": os.path.join("tests", "data", "ontology.ttl"),
+        "root_node": "entity",
+    }
+    config_path = os.path.join(output_directory, "biocypher_config.yaml")
+    os.makedirs(output_directory, exist_ok=True)
+    with open(config_path, "w") as file:
+        yaml.safe_dump(config, file)
+    return BioCypher(
+        biocypher_config_path=config_path,
+        schema_config_path=os.path.join("config", "schema_config.yaml"),
+        output_directory=os.path.join(output_directory, "out"),
+    )
+
+
+def benchmark_neo4j_import(path, output_directory="biocypher-benchmark"):
+    """
+    Time `write_neo4j_import` with 1, 2, 4, ... shards, up to the number of
+    available CPUs, and check that all write the same rows.
+    """
+    adapter = IRefIndexAdapter(curie_index_path=None)
+    adapter.irefindex_process("*", [path])
+
+    cpus = available_cpus()
+    logger.info(f"Neo4j import: shards vs 1 shard, {cpus} CPUs")
+    durations, rows = {}, {}
+    shards = 1
+    while shards <= cpus:
+        directory = os.path.join(output_directory, f"shards_{shards}")
+        shutil.rmtree(directory, ignore_errors=True)
+        bc = create_offline_biocypher(directory)
+        t0 = perf_counter()
+        adapter.write_neo4j_import(bc, shards=shards)
+        durations[shards] = perf_counter() - t0
+        rows[shards] = sorted(
+            line
+            for part in os.listdir(bc._output_directory)
+            if "-part" in part
+            for line in open(os.path.join(bc._output_directory, part))
+        )
+        logger.info(
+            f"{shards} shards: {round(durations[shards], 2)} s, "
+            f"speedup {round(durations[1] / durations[shards], 2)}x"
+        )
+        assert rows[shards] == rows[1]
+        shards *= 2
+
+
+if __name__ == "__main__":
+    number_of_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    path = sys.argv[2] if len(sys.argv) > 2 else f"synthetic_{number_of_rows}.mitab.txt"
+
+    if not os.path.isfile(path):
+        logger.info(f"Writing synthetic MITAB file with {number_of_rows} rows: {path}")
+        write_synthetic_mitab(path, number_of_rows)
+
+    if sys.argv[3:] == ["shards"]:
+        benchmark_neo4j_import(path)
+        sys.exit()
+
+    lines = list(read_mitab(path))
+
+    benchmark_tokenizer(lines)
+    benchmark_field_extraction(lines)
+    benchmark_memory(lines)
+    benchmark_columnar(lines)
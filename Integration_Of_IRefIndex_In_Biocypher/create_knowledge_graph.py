@@ -1,6 +1,8 @@
 #!/usr/bin/env python
+import os
 import sys
-from biocypher import BioCypher, Resource
+import pooch
+from biocypher import BioCypher
 from template_package.adapters.IRefIndex_adapter import (
     IRefIndexAdapter,
     IRefIndexNodeType,
@@ -13,6 +15,11 @@ from biocypher._logger import logger
 ############# Download data #############
 # Define the taxon_id and the release version
 # if you want to specify a taxon_id that is not in the list below, the file "All" will be downloaded and filtered on taxon_id
+# if you specify several taxon_ids separated by commas (or "known" for all taxon_ids in the list below),
+# the file "All" is downloaded and scanned once, and a separate output directory is written per taxon_id
+# with "delta" as third argument, only the changes since the previous build of the taxon are written,
+# as Cypher statements (biocypher-out/delta) that update the existing graph in place;
+# without a previous build, the full import is written together with the baseline of the next delta build
 
 
 def get_taxon_id_from_arg():
@@ -35,6 +42,11 @@ def get_release_version_from_arg():
     return release_version
 
 
+def get_delta_mode_from_arg():
+    """Incremental build against the previous release if the third argument is 'delta'."""
+    return len(sys.argv) > 3 and sys.argv[3] == "delta"
+
+
 # Set of known taxon IDs
 taxon_ids = {
     "9606",  # homo sapiens
@@ -48,8 +60,23 @@ taxon_ids = {
 }
 taxon_id = get_taxon_id_from_arg()
 release_version = get_release_version_from_arg()
+delta_mode = get_delta_mode_from_arg()
 
-if taxon_id not in taxon_ids:
+# Batch mode: several taxa are built from a single scan of the "All" file
+if taxon_id == "known":
+    batch_taxon_ids = sorted(taxon_ids)
+else:
+    batch_taxon_ids = [taxon.strip() for taxon in taxon_id.split(",") if taxon.strip()]
+batch_mode = len(batch_taxon_ids) > 1
+
+if batch_mode:
+    logger.info(
+        f"Building taxon IDs {batch_taxon_ids} from one scan of the file for 'all organisms'."
+    )
+    url = "https://storage.googleapis.com/irefindex-data/archive/release_{}/psi_mitab/MITAB2.6/All.mitab.08-28-2023.txt.zip".format(
+        release_version
+    )
+elif taxon_id not in taxon_ids:
     logger.info(
         f"Taxon ID {taxon_id} not recognized. Downloading file for 'all organisms'."
     )
@@ -65,20 +92,60 @@ else:
 logger.info("This is the link of IRefIndex data that is downloaded:{}".format(url))
 
 
-# Instantiate the BioCypher interface
-bc = BioCypher(
-    biocypher_config_path=r"config/biocypher_config.yaml",
-    schema_config_path=r"config/schema_config.yaml",
-)
+def create_biocypher(output_directory=None):
+    """Instantiate the BioCypher interface, optionally with its own output directory."""
+    return BioCypher(
+        biocypher_config_path=r"config/biocypher_config.yaml",
+        schema_config_path=r"config/schema_config.yaml",
+        output_directory=output_directory,
+    )
 
-############# Specify resource #############
-resource = Resource(
-    name="IRefIndex",  # Name of the resource
-    url_s=url,
-    lifetime=0,
-)
 
-paths = bc.download(resource)  # Downloads to '.cache' by default
+def fingerprints_path(taxon):
+    """Fingerprint index of the last build of a taxon, the baseline of the next delta build."""
+    return f".cache/IRefIndex/fingerprints_{taxon}.npz"
+
+
+def build(adapter, taxon, output_directory=None):
+    """
+    Write the knowledge graph of one taxon: the full neo4j-admin import, or with
+    delta mode and an index of a previous build, only Cypher update batches of
+    what changed since that build.
+    """
+    index_path = fingerprints_path(taxon)
+    bc = create_biocypher(output_directory=output_directory)
+    if delta_mode and os.path.isfile(index_path):
+        delta_directory = os.path.join(output_directory or "biocypher-out", "delta")
+        logger.info(f"Writing the changes since the previous build to {delta_directory}")
+        # node labels and edge type are taken from the schema of bc
+        adapter.write_delta(index_path, delta_directory, bc)
+        return
+
+    if not delta_mode and os.path.isfile(index_path):
+        # the full import replaces the graph that the index was built for
+        os.remove(index_path)
+
+    ############# Create a knowledge graph from the adapter #############
+    # nodes and edges are written straight to the neo4j-admin import files,
+    # in delta mode with the index of this build, the baseline of the next one
+    adapter.write_neo4j_import(bc, index_path=index_path if delta_mode else None)
+    ############# Write admin import statement #############
+    bc.write_import_call()
+    ############# Print summary #############
+    bc.summary()
+
+
+############# Download resource #############
+# The zip archive is kept as it is (bc.download would unpack it),
+# the adapter streams the MITAB rows straight out of it
+paths = [
+    pooch.retrieve(
+        url=url,
+        known_hash=None,
+        path=".cache/IRefIndex",  # same cache directory as BioCypher
+        progressbar=True,
+    )
+]
 logger.info("Data is downloaded in this path: {}".format(paths))
 
 
@@ -99,13 +166,20 @@ adapter = IRefIndexAdapter(
     node_fields=node_fields,
     edge_types=edge_type,
     edge_fields=edge_fields,
+    # later runs on the same file and taxa skip parsing
+    snapshot_directory=".cache/IRefIndex/snapshots",
 )
 
-adapter.irefindex_process(taxon_id, paths)
-############# Create a knowledge graph from the adapter #############
-bc.write_nodes(adapter.get_nodes())
-bc.write_edges(adapter.get_edges())
-############# Write admin import statement #############
-bc.write_import_call()
-############# Print summary #############
-bc.summary()
+if batch_mode:
+    adapter.irefindex_process(batch_taxon_ids, paths)
+
+    for batch_taxon_id in batch_taxon_ids:
+        logger.info(f"Creating the knowledge graph for taxon ID {batch_taxon_id}")
+        build(
+            adapter.for_taxon(batch_taxon_id),
+            batch_taxon_id,
+            output_directory=f"biocypher-out/taxon_{batch_taxon_id}",
+        )
+else:
+    adapter.irefindex_process(taxon_id, paths)
+    build(adapter, taxon_id)
@@ -2,17 +2,71 @@
 from biocypher._logger import logger
 from enum import Enum, auto
 from typing import Union
-from itertools import chain
+from itertools import chain, islice
+from contextlib import closing, contextmanager
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from functools import partial
+import copy
+import gc
+import gzip
+import io
+import json
+import os
 import re
+import shutil
+import zipfile
 from time import time
 from typing import Optional
-from bioregistry import normalize_curie
 from tqdm import tqdm  # progress bar
 from dataclasses import dataclass
+from hashlib import blake2b
+from .curie_index import CURIE_INDEX_PATH, CurieIndex, get_curie_index
+from .neo4j_import import (
+    NEO4J_IMPORT_CHUNK_SIZE,
+    NEO4J_IMPORT_SHARDS,
+    Neo4jImportWriter,
+    get_biocypher_writer,
+)
+from .delta import (
+    DELTA_BATCH_SIZE,
+    CypherDeltaWriter,
+    FingerprintIndex,
+    FingerprintRecorder,
+    biocypher_edge_type,
+    biocypher_node_types,
+    biocypher_property_types,
+)
+from array import array
+import numpy as np
 
 
 logger.debug(f"Loading module {__name__}.")
 
+# Size of the read buffer used when streaming MITAB files
+MITAB_READ_BUFFER_SIZE = 1024 * 1024
+
+# Number of rows per task when compressed files are parsed in parallel
+MITAB_BATCH_SIZE = 50_000
+
+# Number of byte ranges per worker when plain files are parsed in parallel
+RANGES_PER_WORKER = 4
+
+# Number of edges per block yielded by IRefIndexAdapter.get_edge_batches
+EDGE_BATCH_SIZE = 50_000
+
+# MITAB 2.6 columns used by the adapter: method, pubmed id, taxon a, taxon b,
+# relationship id, final reference a and final reference b
+MITAB_COLUMNS = (6, 8, 9, 10, 13, 38, 39)
+_get_mitab_columns = itemgetter(*MITAB_COLUMNS)
+
+# Rows with one of these partner types are skipped
+SKIPPED_PARTNER_PREFIXES = ("complex:", "pdb:", "flybase:")
+
+TAXON_PATTERN = re.compile(r"taxid:(\d+)")
+RELATIONSHIP_ID_PATTERN = re.compile(r"rigid:([^|]+)")
+
 @dataclass
 class Interaction:
     partner_a: str
@@ -24,6 +78,911 @@ class Interaction:
     taxon_id: set[str]
     relationship_id: set[str]
 
+
+@dataclass
+class Protein:
+    """
+    Properties of a protein, aggregated over all its interactions.
+    """
+
+    protein_id: str
+    pmid: set[str]
+    method: set[str]
+    taxon: set[str]
+
+
+# Interaction pairs are stored under one integer key: code of partner a
+# shifted by this number of bits, plus the code of partner b
+_PAIR_SHIFT = 32
+_PAIR_MASK = (1 << _PAIR_SHIFT) - 1
+
+
+class Vocabulary:
+    """
+    Integer coding of repeated strings. Codes are given in order of first
+    appearance, and every value is stored only once.
+    """
+
+    __slots__ = ("values", "codes")
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+class InteractionRecord:
+    """
+    Attributes of one interaction pair as small tuples of vocabulary codes
+    (and a bitset of method codes) instead of sets of strings.
+    """
+
+    __slots__ = ("pmid", "method", "taxon_a", "taxon_b", "taxon_id", "relationship_id")
+
+    def __init__(self):
+        self.pmid = ()
+        self.method = 0
+        self.taxon_a = ()
+        self.taxon_b = ()
+        self.taxon_id = ()
+        self.relationship_id = ()
+
+
+class ProteinRecord:
+    """
+    Union of the pubmed ids, methods (as a bitset) and taxa of all
+    interactions of one protein, as distinct vocabulary codes like in
+    `InteractionRecord` (see `_add_code`).
+    """
+
+    __slots__ = ("pmid", "method", "taxon")
+
+    def __init__(self):
+        self.pmid = ()
+        self.method = 0
+        self.taxon = ()
+
+
+# Codes of a record are kept in a tuple up to this number of codes, and in a
+# set above it, so hub proteins do not copy a long tuple for every new code
+MAX_TUPLE_CODES = 32
+
+
+def _add_code(codes, code):
+    if code in codes:
+        return codes
+    if isinstance(codes, set):
+        codes.add(code)
+        return codes
+    if len(codes) >= MAX_TUPLE_CODES:
+        return {*codes, code}
+    return codes + (code,)
+
+
+def _bitset_codes(bitset: int):
+    while bitset:
+        lowest = bitset & -bitset
+        yield lowest.bit_length() - 1
+        bitset ^= lowest
+
+
+class InteractionStore:
+    """
+    Compact store of interactions, keyed by the (partner_a, partner_b) pair.
+
+    Partners, taxa, methods and pubmed ids are coded as integers of shared
+    vocabularies, and every pair holds a single `InteractionRecord`. The store
+    can be used like a dictionary of `Interaction` objects: lookups and
+    iteration decode the records to interactions with sets of strings.
+
+    While rows are added, the properties of every protein are aggregated in a
+    `ProteinRecord`, so `proteins_properties` does not have to scan the pairs.
+
+    Args:
+        reciprocal: if True, (a, b) and (b, a) are the same interaction. The
+            pair is kept in the orientation of the partner that was seen first.
+    """
+
+    def __init__(self, reciprocal: bool = False):
+        self.reciprocal = reciprocal
+        self.proteins = Vocabulary()
+        self.taxa = Vocabulary()
+        self.methods = Vocabulary()
+        self.pmids = Vocabulary()
+        self.records = {}
+        # ProteinRecord per protein code
+        self.protein_records = []
+
+    def _protein_record(self, code: int) -> ProteinRecord:
+        if code == len(self.protein_records):
+            self.protein_records.append(ProteinRecord())
+        return self.protein_records[code]
+
+    def add(
+        self,
+        partner_a: str,
+        partner_b: str,
+        pmid: str,
+        method: str,
+        taxon_a: str,
+        taxon_b: str,
+        taxon_id: str,
+        relationship_id: str,
+    ):
+        """
+        Add one MITAB row to the store, empty strings are missing values.
+        """
+        code_a = self.proteins.encode(partner_a)
+        protein_a = self._protein_record(code_a)
+        code_b = self.proteins.encode(partner_b)
+        protein_b = self._protein_record(code_b)
+
+        pmid_code = self.pmids.encode(pmid) if pmid != "" else None
+        method_bit = 1 << self.methods.encode(method) if method != "" else 0
+        taxon_a_code = self.taxa.encode(taxon_a) if taxon_a != "" else None
+        taxon_b_code = self.taxa.encode(taxon_b) if taxon_b != "" else None
+
+        for protein, taxon_code in ((protein_a, taxon_a_code), (protein_b, taxon_b_code)):
+            if pmid_code is not None:
+                protein.pmid = _add_code(protein.pmid, pmid_code)
+            protein.method |= method_bit
+            if taxon_code is not None:
+                protein.taxon = _add_code(protein.taxon, taxon_code)
+
+        if self.reciprocal and code_a > code_b:
+            code_a, code_b = code_b, code_a
+            taxon_a_code, taxon_b_code = taxon_b_code, taxon_a_code
+
+        key = code_a << _PAIR_SHIFT | code_b
+        record = self.records.get(key)
+        if record is None:
+            record = self.records[key] = InteractionRecord()
+
+        if pmid_code is not None:
+            record.pmid = _add_code(record.pmid, pmid_code)
+        record.method |= method_bit
+        if taxon_a_code is not None:
+            record.taxon_a = _add_code(record.taxon_a, taxon_a_code)
+        if taxon_b_code is not None:
+            record.taxon_b = _add_code(record.taxon_b, taxon_b_code)
+        record.taxon_id = _add_code(record.taxon_id, self.taxa.encode(taxon_id))
+        if relationship_id != "":
+            record.relationship_id = _add_code(record.relationship_id, relationship_id)
+
+    def merge(self, other: "InteractionStore") -> "InteractionStore":
+        """
+        Merge the interactions of another store into this one. The codes of
+        `other` are translated to the vocabularies of this store, and new
+        pairs are appended in the order of `other`.
+        """
+        proteins = [self.proteins.encode(value) for value in other.proteins.values]
+        taxa = [self.taxa.encode(value) for value in other.taxa.values]
+        methods = [self.methods.encode(value) for value in other.methods.values]
+        pmids = [self.pmids.encode(value) for value in other.pmids.values]
+
+        for other_code, other_protein in enumerate(other.protein_records):
+            protein = self._protein_record(proteins[other_code])
+            for code in other_protein.pmid:
+                protein.pmid = _add_code(protein.pmid, pmids[code])
+            for code in _bitset_codes(other_protein.method):
+                protein.method |= 1 << methods[code]
+            for code in other_protein.taxon:
+                protein.taxon = _add_code(protein.taxon, taxa[code])
+
+        for other_key, other_record in other.records.items():
+            code_a = proteins[other_key >> _PAIR_SHIFT]
+            code_b = proteins[other_key & _PAIR_MASK]
+            taxon_a, taxon_b = other_record.taxon_a, other_record.taxon_b
+            if self.reciprocal and code_a > code_b:
+                code_a, code_b = code_b, code_a
+                taxon_a, taxon_b = taxon_b, taxon_a
+
+            key = code_a << _PAIR_SHIFT | code_b
+            record = self.records.get(key)
+            if record is None:
+                record = self.records[key] = InteractionRecord()
+
+            for code in other_record.pmid:
+                record.pmid = _add_code(record.pmid, pmids[code])
+            for code in _bitset_codes(other_record.method):
+                record.method |= 1 << methods[code]
+            for code in taxon_a:
+                record.taxon_a = _add_code(record.taxon_a, taxa[code])
+            for code in taxon_b:
+                record.taxon_b = _add_code(record.taxon_b, taxa[code])
+            for code in other_record.taxon_id:
+                record.taxon_id = _add_code(record.taxon_id, taxa[code])
+            for relationship_id in other_record.relationship_id:
+                record.relationship_id = _add_code(
+                    record.relationship_id, relationship_id
+                )
+
+        return self
+
+    def _key(self, partners) -> Optional[int]:
+        partner_a, partner_b = partners
+        code_a = self.proteins.codes.get(partner_a)
+        code_b = self.proteins.codes.get(partner_b)
+        if code_a is None or code_b is None:
+            return None
+        if self.reciprocal and code_a > code_b:
+            code_a, code_b = code_b, code_a
+        return code_a << _PAIR_SHIFT | code_b
+
+    def _partners(self, key: int) -> tuple[str, str]:
+        proteins = self.proteins.values
+        return proteins[key >> _PAIR_SHIFT], proteins[key & _PAIR_MASK]
+
+    def _decode(self, key: int, record: InteractionRecord) -> Interaction:
+        partner_a, partner_b = self._partners(key)
+        taxa = self.taxa.values
+        pmids = self.pmids.values
+        methods = self.methods.values
+        return Interaction(
+            partner_a=partner_a,
+            partner_b=partner_b,
+            pmid={pmids[code] for code in record.pmid},
+            method={methods[code] for code in _bitset_codes(record.method)},
+            taxon_a={taxa[code] for code in record.taxon_a},
+            taxon_b={taxa[code] for code in record.taxon_b},
+            taxon_id={taxa[code] for code in record.taxon_id},
+            relationship_id=set(record.relationship_id),
+        )
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, partners) -> bool:
+        key = self._key(partners)
+        return key is not None and key in self.records
+
+    def __getitem__(self, partners) -> Interaction:
+        key = self._key(partners)
+        if key is None or key not in self.records:
+            raise KeyError(partners)
+        return self._decode(key, self.records[key])
+
+    def __iter__(self):
+        return self.keys()
+
+    def keys(self):
+        for key in self.records:
+            yield self._partners(key)
+
+    def values(self):
+        for key, record in self.records.items():
+            yield self._decode(key, record)
+
+    def items(self):
+        for key, record in self.records.items():
+            interaction = self._decode(key, record)
+            yield (interaction.partner_a, interaction.partner_b), interaction
+
+    def property_lists(self, transform=str):
+        """
+        Yield per interaction the partners and lists of the pubmed ids,
+        methods, taxa of partner a and b and relationship ids. `transform` is
+        applied once per distinct value instead of once per occurrence.
+        """
+        proteins = self.proteins.values
+        taxa = [transform(value) for value in self.taxa.values]
+        pmids = [transform(value) for value in self.pmids.values]
+        methods = [transform(value) for value in self.methods.values]
+        relationship_ids = {}
+
+        for key, record in self.records.items():
+            relationship_id = []
+            for value in record.relationship_id:
+                transformed = relationship_ids.get(value)
+                if transformed is None:
+                    transformed = relationship_ids[value] = transform(value)
+                relationship_id.append(transformed)
+
+            yield (
+                proteins[key >> _PAIR_SHIFT],
+                proteins[key & _PAIR_MASK],
+                [pmids[code] for code in record.pmid],
+                [methods[code] for code in _bitset_codes(record.method)],
+                [taxa[code] for code in record.taxon_a],
+                [taxa[code] for code in record.taxon_b],
+                relationship_id,
+            )
+
+    def proteins_properties(self):
+        """
+        Yield a `Protein` per protein, in order of first appearance.
+        """
+        taxa = self.taxa.values
+        pmids = self.pmids.values
+        methods = self.methods.values
+        for protein_id, record in zip(self.proteins.values, self.protein_records):
+            yield Protein(
+                protein_id=protein_id,
+                pmid={pmids[code] for code in record.pmid},
+                method={methods[code] for code in _bitset_codes(record.method)},
+                taxon={taxa[code] for code in record.taxon},
+            )
+
+
+def _segmented_unique(groups, values, number_of_groups: int):
+    """
+    Set union of `values` per group, as a (offsets, values) pair: the unique
+    values of group i are values[offsets[i]:offsets[i + 1]]. Negative values
+    are missing values and are dropped.
+    """
+    present = values >= 0
+    groups = groups[present]
+    values = values[present]
+    width = int(values.max()) + 1 if values.size else 1
+
+    # one sort over (group, value) gives every group's unique values in a row
+    keys = np.unique(groups.astype(np.int64) * width + values)
+    offsets = np.searchsorted(keys // width, np.arange(number_of_groups + 1))
+
+    return offsets, keys % width
+
+
+class ColumnarInteractionTable:
+    """
+    Columnar table of interactions, with the same dictionary-like interface
+    as `InteractionStore`.
+
+    Every MITAB row is appended as vocabulary codes to one integer array per
+    column, so memory grows by a few bytes per row. Rows are grouped per pair
+    with vectorized numpy operations (sort/unique on the pair codes) the first
+    time the table is read, and the pubmed ids, methods, taxa and relationship
+    ids of a pair are aggregated as segmented unique operations.
+
+    Args:
+        reciprocal: if True, pairs are canonicalized to (min, max) of the
+            partner codes, so (a, b) and (b, a) are the same interaction.
+    """
+
+    columns = ("partner_a", "partner_b", "pmid", "method", "taxon_a", "taxon_b", "relationship_id")
+
+    def __init__(self, reciprocal: bool = False):
+        self.reciprocal = reciprocal
+        self.proteins = Vocabulary()
+        self.taxa = Vocabulary()
+        self.methods = Vocabulary()
+        self.pmids = Vocabulary()
+        self.relationship_ids = Vocabulary()
+        self.taxon_ids = Vocabulary()
+
+        # rows that are not grouped yet
+        self.rows = {column: array("i") for column in self.columns}
+        # grouped columns
+        self.data = None
+        self._groups = None
+
+    def add(
+        self,
+        partner_a: str,
+        partner_b: str,
+        pmid: str,
+        method: str,
+        taxon_a: str,
+        taxon_b: str,
+        taxon_id: str,
+        relationship_id: str,
+    ):
+        """
+        Append one MITAB row to the table, empty strings are missing values.
+        """
+        rows = self.rows
+        rows["partner_a"].append(self.proteins.encode(partner_a))
+        rows["partner_b"].append(self.proteins.encode(partner_b))
+        rows["pmid"].append(self.pmids.encode(pmid) if pmid != "" else -1)
+        rows["method"].append(self.methods.encode(method) if method != "" else -1)
+        rows["taxon_a"].append(self.taxa.encode(taxon_a) if taxon_a != "" else -1)
+        rows["taxon_b"].append(self.taxa.encode(taxon_b) if taxon_b != "" else -1)
+        rows["relationship_id"].append(
+            self.relationship_ids.encode(relationship_id) if relationship_id != "" else -1
+        )
+        # a table only holds the rows of one taxon label
+        self.taxon_ids.encode(taxon_id)
+        self._groups = None
+
+    def merge(self, other: "ColumnarInteractionTable") -> "ColumnarInteractionTable":
+        """
+        Append the rows of another table, translating its codes to the
+        vocabularies of this table.
+        """
+        vocabularies = {
+            "partner_a": (self.proteins, other.proteins),
+            "partner_b": (self.proteins, other.proteins),
+            "pmid": (self.pmids, other.pmids),
+            "method": (self.methods, other.methods),
+            "taxon_a": (self.taxa, other.taxa),
+            "taxon_b": (self.taxa, other.taxa),
+            "relationship_id": (self.relationship_ids, other.relationship_ids),
+        }
+        translations = {}
+        for column, (vocabulary, other_vocabulary) in vocabularies.items():
+            # the last entry translates missing values (-1) to -1
+            translations[column] = np.array(
+                [vocabulary.encode(value) for value in other_vocabulary.values] + [-1],
+                dtype=np.int32,
+            )
+        for value in other.taxon_ids.values:
+            self.taxon_ids.encode(value)
+
+        other_data = other._flush()
+        self._flush()
+        self.data = {
+            column: np.concatenate(
+                (self.data[column], translations[column][other_data[column]])
+            )
+            for column in self.columns
+        }
+        self._groups = None
+
+        return self
+
+    def _flush(self) -> dict:
+        """
+        Move the appended rows into the numpy columns.
+        """
+        if self.data is None:
+            self.data = {column: np.empty(0, dtype=np.int32) for column in self.columns}
+
+        if len(self.rows["partner_a"]):
+            self.data = {
+                column: np.concatenate(
+                    (self.data[column], np.array(self.rows[column], dtype=np.int32))
+                )
+                for column in self.columns
+            }
+            self.rows = {column: array("i") for column in self.columns}
+
+        return self.data
+
+    def _group(self) -> dict:
+        """
+        Group the rows per pair, in order of first appearance of the pairs.
+        """
+        if self._groups is not None:
+            return self._groups
+
+        data = self._flush()
+        partner_a, partner_b = data["partner_a"], data["partner_b"]
+        taxon_a, taxon_b = data["taxon_a"], data["taxon_b"]
+
+        if self.reciprocal:
+            swap = partner_a > partner_b
+            partner_a, partner_b = (
+                np.where(swap, partner_b, partner_a),
+                np.where(swap, partner_a, partner_b),
+            )
+            taxon_a, taxon_b = (
+                np.where(swap, taxon_b, taxon_a),
+                np.where(swap, taxon_a, taxon_b),
+            )
+
+        pair_keys = partner_a.astype(np.int64) << _PAIR_SHIFT | partner_b
+        sorted_keys, first_rows, inverse = np.unique(
+            pair_keys, return_index=True, return_inverse=True
+        )
+        inverse = inverse.reshape(-1)
+
+        # number the groups in order of first appearance
+        order = np.argsort(first_rows, kind="stable")
+        ranks = np.empty_like(order)
+        ranks[order] = np.arange(order.size)
+        groups = ranks[inverse]
+        number_of_groups = order.size
+
+        self._groups = {
+            "pairs": sorted_keys[order],
+            "sorted_keys": sorted_keys,
+            "ranks": ranks,
+            "pmid": _segmented_unique(groups, data["pmid"], number_of_groups),
+            "method": _segmented_unique(groups, data["method"], number_of_groups),
+            "taxon_a": _segmented_unique(groups, taxon_a, number_of_groups),
+            "taxon_b": _segmented_unique(groups, taxon_b, number_of_groups),
+            "relationship_id": _segmented_unique(
+                groups, data["relationship_id"], number_of_groups
+            ),
+        }
+        return self._groups
+
+    def _interactions(self, indices=None):
+        groups = self._group()
+        proteins = self.proteins.values
+        taxon_ids = self.taxon_ids.values
+        fields = (
+            ("pmid", self.pmids.values),
+            ("method", self.methods.values),
+            ("taxon_a", self.taxa.values),
+            ("taxon_b", self.taxa.values),
+            ("relationship_id", self.relationship_ids.values),
+        )
+        segments = [
+            (groups[name][0].tolist(), groups[name][1].tolist(), vocabulary)
+            for name, vocabulary in fields
+        ]
+        pairs = groups["pairs"].tolist()
+
+        for i in range(len(pairs)) if indices is None else indices:
+            values = [
+                {vocabulary[code] for code in codes[offsets[i] : offsets[i + 1]]}
+                for offsets, codes, vocabulary in segments
+            ]
+            yield Interaction(
+                partner_a=proteins[pairs[i] >> _PAIR_SHIFT],
+                partner_b=proteins[pairs[i] & _PAIR_MASK],
+                pmid=values[0],
+                method=values[1],
+                taxon_a=values[2],
+                taxon_b=values[3],
+                taxon_id=set(taxon_ids),
+                relationship_id=values[4],
+            )
+
+    def _index(self, partners) -> Optional[int]:
+        partner_a, partner_b = partners
+        code_a = self.proteins.codes.get(partner_a)
+        code_b = self.proteins.codes.get(partner_b)
+        if code_a is None or code_b is None:
+            return None
+        if self.reciprocal and code_a > code_b:
+            code_a, code_b = code_b, code_a
+
+        groups = self._group()
+        key = code_a << _PAIR_SHIFT | code_b
+        position = int(np.searchsorted(groups["sorted_keys"], key))
+        if position == groups["sorted_keys"].size or groups["sorted_keys"][position] != key:
+            return None
+        return int(groups["ranks"][position])
+
+    def __len__(self):
+        return int(self._group()["pairs"].size)
+
+    def __contains__(self, partners) -> bool:
+        return self._index(partners) is not None
+
+    def __getitem__(self, partners) -> Interaction:
+        index = self._index(partners)
+        if index is None:
+            raise KeyError(partners)
+        return next(self._interactions([index]))
+
+    def __iter__(self):
+        return self.keys()
+
+    def keys(self):
+        proteins = self.proteins.values
+        for pair in self._group()["pairs"].tolist():
+            yield proteins[pair >> _PAIR_SHIFT], proteins[pair & _PAIR_MASK]
+
+    def values(self):
+        return self._interactions()
+
+    def items(self):
+        for interaction in self._interactions():
+            yield (interaction.partner_a, interaction.partner_b), interaction
+
+    def property_lists(self, transform=str):
+        """
+        Yield per interaction the partners and lists of the pubmed ids,
+        methods, taxa of partner a and b and relationship ids. `transform` is
+        applied once per distinct value instead of once per occurrence.
+        """
+        groups = self._group()
+        proteins = self.proteins.values
+        taxa = [transform(value) for value in self.taxa.values]
+        fields = (
+            ("pmid", [transform(value) for value in self.pmids.values]),
+            ("method", [transform(value) for value in self.methods.values]),
+            ("taxon_a", taxa),
+            ("taxon_b", taxa),
+            ("relationship_id", [transform(value) for value in self.relationship_ids.values]),
+        )
+        segments = [
+            (groups[name][0].tolist(), groups[name][1].tolist(), vocabulary)
+            for name, vocabulary in fields
+        ]
+
+        for i, pair in enumerate(groups["pairs"].tolist()):
+            yield (
+                proteins[pair >> _PAIR_SHIFT],
+                proteins[pair & _PAIR_MASK],
+                *(
+                    [vocabulary[code] for code in codes[offsets[i] : offsets[i + 1]]]
+                    for offsets, codes, vocabulary in segments
+                ),
+            )
+
+    def proteins_properties(self):
+        """
+        Yield a `Protein` per protein, in order of first appearance.
+        """
+        data = self._flush()
+        number_of_proteins = len(self.proteins)
+        # every row counts for both of its partners
+        proteins = np.concatenate((data["partner_a"], data["partner_b"]))
+        segments = []
+        for values, vocabulary in (
+            (np.tile(data["pmid"], 2), self.pmids.values),
+            (np.tile(data["method"], 2), self.methods.values),
+            (np.concatenate((data["taxon_a"], data["taxon_b"])), self.taxa.values),
+        ):
+            offsets, codes = _segmented_unique(proteins, values, number_of_proteins)
+            segments.append((offsets.tolist(), codes.tolist(), vocabulary))
+
+        for i, protein_id in enumerate(self.proteins.values):
+            pmid, method, taxon = (
+                {vocabulary[code] for code in codes[offsets[i] : offsets[i + 1]]}
+                for offsets, codes, vocabulary in segments
+            )
+            yield Protein(protein_id=protein_id, pmid=pmid, method=method, taxon=taxon)
+
+
+# Version of the layout of interaction snapshots, part of their key
+SNAPSHOT_VERSION = 1
+
+# Chunk size used to hash MITAB files for the snapshot key
+SNAPSHOT_HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def _encode_segments(lists, vocabulary: Vocabulary) -> tuple:
+    """
+    Code a sequence of lists of strings as a (offsets, codes) pair of numpy
+    arrays: the codes of list i are codes[offsets[i]:offsets[i + 1]].
+    """
+    offsets = array("q", [0])
+    codes = array("i")
+    for values in lists:
+        codes.extend(vocabulary.encode(value) for value in values)
+        offsets.append(len(codes))
+    return np.frombuffer(offsets, dtype=np.int64), np.frombuffer(codes, dtype=np.int32)
+
+
+class InteractionSnapshot:
+    """
+    Read-only interaction table loaded from a snapshot on disk, with the same
+    dictionary-like interface as `InteractionStore`.
+
+    A snapshot holds the deduplicated pairs and the aggregated properties of
+    every pair and protein as columnar numpy arrays of vocabulary codes (one
+    .npy file per column, opened memory-mapped), and one text file per
+    vocabulary. It is written once from a parsed table with `save`, and
+    yields the same interactions and proteins, in the same order.
+
+    Args:
+        path: directory of the snapshot
+        mmap_mode: mode to open the arrays with, see `numpy.load`
+    """
+
+    pair_fields = ("pmid", "method", "taxon_a", "taxon_b", "taxon_id", "relationship_id")
+    protein_fields = ("pmid", "method", "taxon")
+    vocabularies = ("proteins", "pmids", "methods", "taxa", "relationship_ids")
+    # vocabulary of every field
+    field_vocabularies = {
+        "pmid": "pmids",
+        "method": "methods",
+        "taxon_a": "taxa",
+        "taxon_b": "taxa",
+        "taxon_id": "taxa",
+        "taxon": "taxa",
+        "relationship_id": "relationship_ids",
+    }
+
+    def __init__(self, path: str, mmap_mode: Optional[str] = "r"):
+        self.path = path
+        with open(os.path.join(path, "snapshot.json")) as file:
+            metadata = json.load(file)
+        self.reciprocal = metadata["reciprocal"]
+
+        for name in self.vocabularies:
+            vocabulary = Vocabulary()
+            with open(os.path.join(path, f"{name}.txt"), encoding="utf-8") as file:
+                text = file.read()
+            vocabulary.values = text.split("\n") if text else []
+            setattr(self, name, vocabulary)
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        self.pairs = load("pairs")
+        self.segments = {
+            field: (load(f"{field}_offsets"), load(f"{field}_codes"))
+            for field in self.pair_fields
+        }
+        self.protein_segments = {
+            field: (load(f"protein_{field}_offsets"), load(f"protein_{field}_codes"))
+            for field in self.protein_fields
+        }
+        self._pair_index = None
+
+    @classmethod
+    def save(cls, table, path: str):
+        """
+        Write the interactions and proteins of `table` (an `InteractionStore`
+        or `ColumnarInteractionTable`) as a snapshot in directory `path`.
+        """
+        vocabularies = {name: Vocabulary() for name in cls.vocabularies}
+
+        # the protein codes follow the order of the proteins of the table
+        proteins = list(table.proteins_properties())
+        for protein in proteins:
+            vocabularies["proteins"].encode(protein.protein_id)
+
+        # property_lists keeps the order of the values, values gives taxon_id
+        pairs = array("q")
+        lists = {field: [] for field in cls.pair_fields}
+        for row, interaction in zip(table.property_lists(), table.values()):
+            partner_a, partner_b, *values = row
+            pairs.append(
+                vocabularies["proteins"].encode(partner_a) << _PAIR_SHIFT
+                | vocabularies["proteins"].encode(partner_b)
+            )
+            values.insert(4, sorted(interaction.taxon_id))
+            for field, value in zip(cls.pair_fields, values):
+                lists[field].append(value)
+
+        temporary_path = f"{path}.tmp{os.getpid()}"
+        os.makedirs(temporary_path, exist_ok=True)
+
+        def save(name, values):
+            np.save(os.path.join(temporary_path, f"{name}.npy"), values)
+
+        save("pairs", np.frombuffer(pairs, dtype=np.int64))
+        for field in cls.pair_fields:
+            offsets, codes = _encode_segments(
+                lists.pop(field), vocabularies[cls.field_vocabularies[field]]
+            )
+            save(f"{field}_offsets", offsets)
+            save(f"{field}_codes", codes)
+        for field in cls.protein_fields:
+            offsets, codes = _encode_segments(
+                (getattr(protein, field) for protein in proteins),
+                vocabularies[cls.field_vocabularies[field]],
+            )
+            save(f"protein_{field}_offsets", offsets)
+            save(f"protein_{field}_codes", codes)
+
+        for name, vocabulary in vocabularies.items():
+            with open(os.path.join(temporary_path, f"{name}.txt"), "w", encoding="utf-8") as file:
+                file.write("\n".join(vocabulary.values))
+        # written last, a snapshot without it is incomplete
+        with open(os.path.join(temporary_path, "snapshot.json"), "w") as file:
+            json.dump(
+                {
+                    "version": SNAPSHOT_VERSION,
+                    "reciprocal": table.reciprocal,
+                    "interactions": len(pairs),
+                    "proteins": len(proteins),
+                },
+                file,
+            )
+
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(temporary_path, path)
+
+    def _decode_segments(self, segments: dict, index: int) -> list:
+        values = []
+        for field, (offsets, codes) in segments.items():
+            vocabulary = getattr(self, self.field_vocabularies[field]).values
+            values.append(
+                [vocabulary[code] for code in codes[offsets[index] : offsets[index + 1]].tolist()]
+            )
+        return values
+
+    def _rows(self, segments: dict, transform=None):
+        """
+        Yield per row of `segments` the lists of its values.
+        """
+        decoded = []
+        for field, (offsets, codes) in segments.items():
+            vocabulary = getattr(self, self.field_vocabularies[field]).values
+            if transform is not None:
+                vocabulary = [transform(value) for value in vocabulary]
+            decoded.append((offsets.tolist(), codes.tolist(), vocabulary))
+
+        for i in range(len(decoded[0][0]) - 1):
+            yield [
+                [vocabulary[code] for code in codes[offsets[i] : offsets[i + 1]]]
+                for offsets, codes, vocabulary in decoded
+            ]
+
+    def _partners(self, pair: int) -> tuple[str, str]:
+        proteins = self.proteins.values
+        return proteins[pair >> _PAIR_SHIFT], proteins[pair & _PAIR_MASK]
+
+    def _interaction(self, pair: int, values: list) -> Interaction:
+        partner_a, partner_b = self._partners(pair)
+        return Interaction(partner_a, partner_b, *(set(value) for value in values))
+
+    def _index(self, partners) -> Optional[int]:
+        if self._pair_index is None:
+            self._pair_index = {pair: i for i, pair in enumerate(self.pairs.tolist())}
+            self.proteins.codes = {value: code for code, value in enumerate(self.proteins.values)}
+        partner_a, partner_b = partners
+        code_a = self.proteins.codes.get(partner_a)
+        code_b = self.proteins.codes.get(partner_b)
+        if code_a is None or code_b is None:
+            return None
+        if self.reciprocal and code_a > code_b:
+            code_a, code_b = code_b, code_a
+        return self._pair_index.get(code_a << _PAIR_SHIFT | code_b)
+
+    def __len__(self):
+        return int(self.pairs.size)
+
+    def __contains__(self, partners) -> bool:
+        return self._index(partners) is not None
+
+    def __getitem__(self, partners) -> Interaction:
+        index = self._index(partners)
+        if index is None:
+            raise KeyError(partners)
+        return self._interaction(
+            int(self.pairs[index]), self._decode_segments(self.segments, index)
+        )
+
+    def __iter__(self):
+        return self.keys()
+
+    def keys(self):
+        for pair in self.pairs.tolist():
+            yield self._partners(pair)
+
+    def values(self):
+        for pair, values in zip(self.pairs.tolist(), self._rows(self.segments)):
+            yield self._interaction(pair, values)
+
+    def items(self):
+        for interaction in self.values():
+            yield (interaction.partner_a, interaction.partner_b), interaction
+
+    def property_lists(self, transform=str):
+        """
+        Yield per interaction the partners and lists of the pubmed ids,
+        methods, taxa of partner a and b and relationship ids. `transform` is
+        applied once per distinct value instead of once per occurrence.
+        """
+        segments = {field: self.segments[field] for field in self.pair_fields if field != "taxon_id"}
+        for pair, values in zip(self.pairs.tolist(), self._rows(segments, transform)):
+            yield (*self._partners(pair), *values)
+
+    def proteins_properties(self):
+        """
+        Yield a `Protein` per protein, in order of first appearance.
+        """
+        for protein_id, (pmid, method, taxon) in zip(
+            self.proteins.values, self._rows(self.protein_segments)
+        ):
+            yield Protein(protein_id=protein_id, pmid=set(pmid), method=set(method), taxon=set(taxon))
+
+
+def file_digest(path: str) -> str:
+    """
+    Hex digest of the contents of a file, read in chunks.
+    """
+    digest = blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for chunk in iter(partial(file.read, SNAPSHOT_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+INTERACTION_ENGINES = {
+    "store": InteractionStore,
+    "columnar": ColumnarInteractionTable,
+}
+
+
 class IRefIndexNodeType(Enum):
     PROTEIN = auto()
 
@@ -41,27 +1000,450 @@ class IRefIndexEdgeFields(Enum):
 
 # Function to determine if an ID is a UniProt/Refseq/Entrez ID
     
+UNIPROT_PATTERN = re.compile(
+    r"^([A-N,R-Z][0-9]([A-Z][A-Z, 0-9][A-Z, 0-9][0-9]){1,2})|([O,P,Q][0-9][A-Z, 0-9][A-Z, 0-9][A-Z, 0-9][0-9])(\.\d+)?(\-\d+)?$"
+)
+REFSEQ_PATTERN = re.compile(
+    r"^(((AC|AP|NC|NG|NM|NP|NR|NT|NW|WP|XM|XP|XR|YP|ZP)_\d+)|(NZ_[A-Z]{2,4}\d+))(\.\d+)?$"
+)
+ENTREZ_PATTERN = re.compile(r"^[A-Z]+[0-9]+(\.\d+)?$")
+
+# input labels of the protein nodes, one per protein type of find_protein_type
+PROTEIN_NODE_LABELS = ("uniprot_protein", "refseq_protein", "entrez_protein")
+
+# maximum number of identifiers kept by an IdentifierCache
+IDENTIFIER_CACHE_SIZE = 1_000_000
+
+
+@contextmanager
+def _paused_gc():
+    """
+    Pause the cyclic garbage collector while a large block of edges is built.
+    The block holds no reference cycles, but every new container in it would
+    otherwise trigger collections that traverse the whole growing block.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def escape_quotes(value: str) -> str:
+    """
+    Replace the quote character of the BioCypher output by "^".
+    """
+    return value.replace("'", "^")
+
+
 def find_protein_type(node_id: str) -> Optional[str]:
-    if bool(re.match(
-            r"^([A-N,R-Z][0-9]([A-Z][A-Z, 0-9][A-Z, 0-9][0-9]){1,2})|([O,P,Q][0-9][A-Z, 0-9][A-Z, 0-9][A-Z, 0-9][0-9])(\.\d+)?(\-\d+)?$",
-            node_id,
-            )
-            ):
+    if UNIPROT_PATTERN.match(node_id):
         return "uniprot"
 
-    elif bool(
-                re.match(
-                    r"^(((AC|AP|NC|NG|NM|NP|NR|NT|NW|WP|XM|XP|XR|YP|ZP)_\d+)|(NZ_[A-Z]{2,4}\d+))(\.\d+)?$",
-                    node_id,
-                )
-            ):
+    elif REFSEQ_PATTERN.match(node_id):
         return "refseq"
 
-    elif bool(re.match(r"^[A-Z]+[0-9]+(\.\d+)?$", node_id)):
+    elif ENTREZ_PATTERN.match(node_id):
         return "entrez"
 
     return None
 
+
+class IdentifierCache:
+    """
+    Bounded cache of the protein type and the normalized CURIE of protein
+    identifiers, shared by `get_nodes` and `get_edges`. Hub proteins take
+    part in thousands of interactions, but are only classified and
+    normalized with bioregistry once.
+
+    The cache only lives in memory: the CURIEs are persisted between runs by
+    the CURIE index behind it, so there is a single cache on disk.
+
+    Args:
+        maxsize: maximum number of identifiers in the cache, the least
+            recently used identifiers are dropped first.
+        normalize: if False, identifiers are classified but not normalized.
+        curies: CURIE index used to normalize the identifiers, the shared
+            index of `get_curie_index` if not given.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = IDENTIFIER_CACHE_SIZE,
+        normalize: bool = True,
+        curies: Optional[CurieIndex] = None,
+    ):
+        self.maxsize = maxsize
+        self.normalize = normalize
+        self.curies = curies
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, identifier: str, sep: str = ":") -> tuple:
+        """
+        Return the protein type (or None) and the CURIE of an identifier.
+        """
+        entry = self.entries.get(identifier)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(identifier)
+            return entry
+
+        self.misses += 1
+        protein_type = find_protein_type(identifier)
+        if self.normalize:
+            if self.curies is None:
+                self.curies = get_curie_index()
+            curie = self.curies.normalize((protein_type or "") + sep + str(identifier))
+        else:
+            curie = identifier
+        entry = self.entries[identifier] = (protein_type, curie)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+        return entry
+
+    def protein_type(self, identifier: str) -> Optional[str]:
+        return self.resolve(identifier)[0]
+
+    def curie(self, identifier: str) -> Optional[str]:
+        return self.resolve(identifier)[1]
+
+    def log_statistics(self):
+        total = self.hits + self.misses
+        hit_rate = round(100 * self.hits / total, 1) if total else 0.0
+        logger.info(
+            f"Identifier cache: {self.hits} hits, {self.misses} misses "
+            f"({hit_rate}% hits), {len(self.entries)} identifiers"
+        )
+
+def read_mitab(path, buffer_size: int = MITAB_READ_BUFFER_SIZE):
+    """
+    Stream the rows of an IRefIndex MITAB 2.6 file line by line.
+
+    The file can be a zip archive (as published by IRefIndex), a gzip file or
+    plain text. Archives are decompressed on the fly through a read buffer of
+    `buffer_size` bytes, so they never have to be unpacked to disk. The header
+    line (starting with "#") is skipped.
+
+    Args:
+        path: path to the MITAB file
+        buffer_size: size of the read buffer in bytes
+    """
+    with open(path, "rb") as raw:
+        if zipfile.is_zipfile(raw):
+            raw.seek(0)
+            with zipfile.ZipFile(raw) as archive:
+                members = [
+                    info for info in archive.infolist() if not info.is_dir()
+                ]
+                if not members:
+                    raise ValueError(f"No MITAB file found in {path}")
+                # IRefIndex archives contain a single mitab file
+                member = max(members, key=lambda info: info.file_size)
+                with archive.open(member) as stream:
+                    yield from _read_lines(stream, buffer_size)
+            return
+
+        raw.seek(0)
+        if raw.read(2) == b"\x1f\x8b":
+            raw.seek(0)
+            with gzip.GzipFile(fileobj=raw) as stream:
+                yield from _read_lines(stream, buffer_size)
+            return
+
+        raw.seek(0)
+        yield from _read_lines(raw, buffer_size)
+
+
+def split_mitab_columns(line: str) -> tuple[str, ...]:
+    """
+    Split a MITAB row into the columns listed in `MITAB_COLUMNS` only.
+
+    The row is split up to the last used column, so the trailing columns of
+    the row are not split into separate strings. This is not faster than a
+    full split: the leading columns still become strings, and slicing out
+    the used columns by their tab offsets (with `str.find` or a regular
+    expression) measured slower than `str.split`.
+    """
+    return _get_mitab_columns(line.split("\t", MITAB_COLUMNS[-1] + 1))
+
+
+def _read_lines(stream, buffer_size: int):
+    buffered = io.BufferedReader(stream, buffer_size=buffer_size)
+    with io.TextIOWrapper(buffered, encoding="utf-8") as text:
+        for line in text:
+            if line.startswith("#"):
+                continue
+            yield line
+
+
+def extract_mitab_fields(line: str, taxa=None) -> Optional[tuple[str, ...]]:
+    """
+    Extract the fields used by the adapter from a MITAB row in one pass over
+    the projected columns.
+
+    Args:
+        line: MITAB row
+        taxa: set of taxa to keep, or None to keep all rows. Rows are kept if
+            both partners belong to the same taxon of the set. Only the
+            partners are checked before the taxa, the other fields are
+            parsed for the rows that are kept.
+
+    Returns:
+        (partner_a, partner_b, pmid, method, taxon_a, taxon_b, relationship_id),
+        or None for rows with a complex, pdb or flybase partner and for rows
+        of other taxa.
+    """
+    # Split the columns that are used by tab character
+    (
+        input_method,
+        input_pmid,
+        input_taxon_a,
+        input_taxon_b,
+        input_relationship_id,
+        input_partner_a,  # PARTNER_A: finalReference A
+        input_partner_b,  # PARTNER_B: FinalReference B
+    ) = split_mitab_columns(line)
+
+    # skip lines with complex, pdb or flybase partners, the cheapest check
+    if input_partner_a.startswith(SKIPPED_PARTNER_PREFIXES) or input_partner_b.startswith(
+        SKIPPED_PARTNER_PREFIXES
+    ):
+        return None
+
+    # taxon_a
+    match_taxon = TAXON_PATTERN.search(input_taxon_a)
+    taxon_a = match_taxon.group(1) if match_taxon else ""
+
+    # taxon_b
+    match_taxon = TAXON_PATTERN.search(input_taxon_b)
+    taxon_b = match_taxon.group(1) if match_taxon else ""
+
+    if taxa is not None and (taxon_a != taxon_b or taxon_a not in taxa):
+        return None
+
+    # isolate id for partner_a: the part between the first and second ":"
+    start = input_partner_a.find(":") + 1
+    if start:
+        end = input_partner_a.find(":", start)
+        partner_a = input_partner_a[start:end] if end != -1 else input_partner_a[start:]
+    else:
+        partner_a = ""
+
+    # isolate id for partner_b
+    start = input_partner_b.find(":") + 1
+    if start:
+        end = input_partner_b.find(":", start)
+        partner_b = input_partner_b[start:end] if end != -1 else input_partner_b[start:]
+    else:
+        partner_b = ""
+
+    # PUBMED_ID: the number after the last ":" of the last "|" separated entry
+    last_part = input_pmid[input_pmid.rfind("|") + 1 :]
+    pmid = last_part[last_part.rfind(":") + 1 :]
+
+    # METHOD: the text between the first pair of brackets
+    start = input_method.find("(") + 1
+    end = input_method.find(")", start) if start else -1
+    method = input_method[start:end] if end != -1 else ""
+
+    # relationship id
+    match_relationship_id = RELATIONSHIP_ID_PATTERN.search(input_relationship_id)
+    relationship_id = match_relationship_id.group(1) if match_relationship_id else ""
+
+    return partner_a, partner_b, pmid, method, taxon_a, taxon_b, relationship_id
+
+
+def get_taxa(taxon_id) -> Optional[frozenset[str]]:
+    """
+    Return the set of taxa selected by `taxon_id`, which is either "*" (all
+    taxa, returns None), a single taxon or a collection of taxa.
+    """
+    if taxon_id == "*":
+        return None
+    if isinstance(taxon_id, str):
+        return frozenset((taxon_id,))
+    return frozenset(taxon_id)
+
+
+def taxon_prefilter(taxa):
+    """
+    Return a cheap test that rejects raw MITAB rows that can not belong to
+    one of `taxa`, before the row is split or parsed. A row of a selected
+    taxon always contains its "taxid:<taxon>" entry, so the test never
+    rejects a row that would be kept; rows that pass it are checked exactly
+    by `extract_mitab_fields`.
+    """
+    if len(taxa) == 1:
+        needle = f"taxid:{next(iter(taxa))}"
+        return lambda line: needle in line
+
+    pattern = re.compile(
+        "taxid:(?:" + "|".join(re.escape(taxon) for taxon in sorted(taxa)) + ")"
+    )
+    return pattern.search
+
+
+def parse_mitab_lines(lines, taxon_id, interactions=None, table=None) -> dict:
+    """
+    Parse MITAB rows into interactions per taxon.
+
+    Args:
+        lines: iterable of MITAB rows
+        taxon_id: "*" for all taxa, a taxon, or a collection of taxa. Only rows
+            where both partners belong to a selected taxon are kept, so
+            several organisms can be extracted in one scan.
+        interactions: dictionary the interactions are added to, a new one is
+            created if not given
+        table: callable that creates an empty interactions table for a
+            taxon, `InteractionStore` if not given
+
+    Returns:
+        {taxon: interactions table}. With "*" or a single taxon, all
+        interactions are stored under `taxon_id`, otherwise under the taxon of
+        the row.
+    """
+    if interactions is None:
+        interactions = {}
+    if table is None:
+        table = InteractionStore
+
+    taxa = get_taxa(taxon_id)
+    single = taxa is None or isinstance(taxon_id, str)
+    if single:
+        taxon_interactions = interactions.setdefault(taxon_id, table())
+    if taxa is not None:
+        prefilter = taxon_prefilter(taxa)
+
+    for line in lines:
+        # reject rows of other taxa before any parsing
+        if taxa is not None and not prefilter(line):
+            continue
+
+        fields = extract_mitab_fields(line, taxa)
+        if fields is None:
+            continue
+
+        (
+            partner_a,
+            partner_b,
+            pmid,
+            method,
+            taxon_a,
+            taxon_b,
+            relationship_id,
+        ) = fields
+
+        if single:
+            label = taxon_id
+        else:
+            label = taxon_a
+            taxon_interactions = interactions.get(label)
+            if taxon_interactions is None:
+                taxon_interactions = interactions[label] = table()
+
+        taxon_interactions.add(
+            partner_a,
+            partner_b,
+            pmid,
+            method,
+            taxon_a,
+            taxon_b,
+            label,
+            relationship_id,
+        )
+
+    return interactions
+
+
+def merge_interactions(interactions: dict, other: dict) -> dict:
+    """
+    Merge the interactions per taxon of `other` into `interactions`. Pairs
+    that are new are appended in the order of `other`, so merging the partial
+    results of consecutive parts of a file in order gives the same result as
+    parsing the whole file at once.
+    """
+    for taxon, store in other.items():
+        if taxon in interactions:
+            interactions[taxon].merge(store)
+        else:
+            interactions[taxon] = store
+
+    return interactions
+
+
+def find_line_aligned_ranges(path, number_of_ranges: int) -> list[tuple[int, int]]:
+    """
+    Split an uncompressed file into at most `number_of_ranges` byte ranges
+    (start, end) that begin at the start of a line.
+    """
+    size = os.path.getsize(path)
+    boundaries = [0]
+
+    with open(path, "rb") as file:
+        for i in range(1, number_of_ranges):
+            file.seek(size * i // number_of_ranges)
+            # move to the start of the next line
+            file.readline()
+            position = file.tell()
+            if boundaries[-1] < position < size:
+                boundaries.append(position)
+
+    boundaries.append(size)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _parse_mitab_byte_range(path, start, end, taxon_id, buffer_size, table=None) -> dict:
+    """
+    Worker function for the parallel mode: parse the rows between byte
+    `start` and `end` of an uncompressed MITAB file.
+    """
+    with open(path, "rb") as file:
+        file.seek(start)
+        data = file.read(end - start)
+
+    return parse_mitab_lines(
+        _read_lines(io.BytesIO(data), buffer_size), taxon_id, table=table
+    )
+
+
+def _is_compressed(path) -> bool:
+    if zipfile.is_zipfile(path):
+        return True
+    with open(path, "rb") as file:
+        return file.read(2) == b"\x1f\x8b"
+
+
+def _batched(iterable, size: int):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _ordered_map(executor, function, arguments, max_pending: int):
+    """
+    Like `executor.map`, but keeps at most `max_pending` tasks submitted at
+    once so the arguments are consumed lazily.
+    """
+    pending = deque()
+    for args in arguments:
+        pending.append(executor.submit(function, *args))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
 class IRefIndexAdapter:
     """
     Adapter that creaes nodes and edges for creating a knowledge graph.
@@ -71,6 +1453,17 @@ class IRefIndexAdapter:
         node_fields: List of node fields to include in the result.
         edge_types: List of edge types to include in the result.
         edge_fields: List of edge fields to include in the result.
+        read_buffer_size: Size of the read buffer (in bytes) used to stream the IRefIndex file.
+        workers: Number of processes used to parse the IRefIndex file. With more than one worker,
+            the file is split in parts that are parsed in a process pool.
+        engine: "store" keeps the interactions in an `InteractionStore`, "columnar" in a
+            `ColumnarInteractionTable` that deduplicates the pairs with numpy.
+        dedup_reciprocal: if True, (a, b) and (b, a) are merged into one interaction.
+        identifier_cache_size: Maximum number of protein identifiers of which the type and CURIE are cached.
+        curie_index_path: SQLite index of normalized CURIEs, shared with the UniProt adapter and persisted
+            between runs. With None, the index only lives in memory.
+        snapshot_directory: Optional directory of snapshots of the parsed interactions, keyed by the hash of the
+            input file and the taxon filter. A run on the same file and taxa loads the snapshot instead of parsing.
     """
 
     def __init__(
@@ -80,6 +1473,13 @@ class IRefIndexAdapter:
         ] = None,
         add_prefix=True,
         nodes_ids=None,
+        read_buffer_size: int = MITAB_READ_BUFFER_SIZE,
+        workers: int = 1,
+        engine: str = "store",
+        dedup_reciprocal: bool = False,
+        identifier_cache_size: int = IDENTIFIER_CACHE_SIZE,
+        curie_index_path: Optional[str] = CURIE_INDEX_PATH,
+        snapshot_directory: Optional[str] = None,
         node_types: Union[None, list[IRefIndexNodeType]] = None,
         node_fields: Union[None, list[IRefIndexNodeFields]] = None,
         edge_types: Union[None, list[IRefIndexEdgeType]] = None,
@@ -88,8 +1488,30 @@ class IRefIndexAdapter:
         self.irefindex_fields = irefindex_fields
         self.add_prefix = add_prefix
         self.nodes_ids = nodes_ids
+        self.read_buffer_size = read_buffer_size
+        self.workers = workers
+
+        if engine not in INTERACTION_ENGINES:
+            raise ValueError(
+                f"Unknown engine {engine}, choose from {list(INTERACTION_ENGINES)}"
+            )
+        self.engine = engine
+        self.dedup_reciprocal = dedup_reciprocal
+        self.new_table = partial(
+            INTERACTION_ENGINES[engine], reciprocal=dedup_reciprocal
+        )
 
-        self.interactions = {}
+        self.snapshot_directory = snapshot_directory
+
+        self.curies = get_curie_index(curie_index_path)
+        self.identifiers = IdentifierCache(
+            identifier_cache_size,
+            normalize=add_prefix,
+            curies=self.curies,
+        )
+
+        self.interactions = self.new_table()
+        self.interactions_by_taxon = {}
 
         self._set_types_and_fields(node_types, node_fields, edge_types, edge_fields)
 
@@ -113,141 +1535,149 @@ class IRefIndexAdapter:
             self.edge_fields = [field for field in chain(IRefIndexEdgeFields)]
 
     def irefindex_process(self,taxon_id, paths):
+        """
+        Extract the interactions from the IRefIndex file.
+
+        Args:
+            taxon_id: "*" for all taxa, a taxon, or a collection of taxa to
+                extract several organisms in a single scan of the file. The
+                interactions of each taxon are kept in `interactions_by_taxon`,
+                use `for_taxon` to get an adapter for one of them.
+            paths: paths of the downloaded IRefIndex files
+        """
         logger.info("Extracting information from IRefIndex data")
-        # Get input file
+        # Get input file, this can be the downloaded zip archive itself
         inputfile= paths[0]
         logger.info("This is the input file that is used: {}".format(inputfile))
 
-        # Open the file
-        with open(inputfile, "r") as file:
-            logger.info(
-                "Getting information for partner_a, partner_b, pubmed_id, method, taxon id and relationship id"
-            )
+        logger.info(
+            "Getting information for partner_a, partner_b, pubmed_id, method, taxon id and relationship id"
+        )
 
-            for line in file:
-                # Split the line by tab character
-                line = line.split("\t")
-            
-                # PARTNER_A: finalReference A
-                input_partner_a = line[38]
-                # PARTNER_B: FinalReference B
-                input_partner_b = line[39]
-
-                # skip lines that start with complex
-                if input_partner_a.startswith("complex:") or input_partner_b.startswith(
-                    "complex:"
-                ):
-                    continue
-
-                if input_partner_a.startswith("pdb:") or input_partner_b.startswith(
-                    "pdb:"
-                ):
-                    continue
-
-                if input_partner_a.startswith("flybase:") or input_partner_b.startswith(
-                    "flybase:"
-                ):
-                    continue
-
-                # isolate id for partner_a
-                parts = input_partner_a.split(":")  
-                if len(parts) > 1:
-                    partner_a = parts[1]  
-                else:
-                    partner_a = ""
-
-                # isolate id for partner_b
-                parts = input_partner_b.split(":")
-                if len(parts) > 1:
-                    partner_b = parts[1]
-                else:
-                    partner_b = ""
-
-                # PUBMED_ID
-                input_pmid = line[8]
-                parts = input_pmid.split("|")
-                last_part = parts[-1]
-                numbers = last_part.split(":")
-                pmid = numbers[-1]
-
-                # METHOD
-                input_method = line[6]
-                pattern_method = r"\((.*?)\)"
-                match_method = re.search(pattern_method, input_method)
-                if match_method:
-                    method = match_method.group(
-                        1
-                    )  # Extracting the text between brackets
-                else:
-                    method = ""
-
-                # taxon_a
-                input_taxon = line[9]
-                pattern_taxon = r"taxid:(\d+)"
-                match_taxon = re.search(pattern_taxon, input_taxon)
-                if match_taxon:
-                    taxon_a = match_taxon.group(1)
-                else:
-                    taxon_a = ""
-                
-                # taxon_b
-                input_taxon = line[10]
-                pattern_taxon = r"taxid:(\d+)"
-                match_taxon = re.search(pattern_taxon, input_taxon)
-                if match_taxon:
-                    taxon_b = match_taxon.group(1)
-                else:
-                    taxon_b = ""
-
-                # relationship id
-                input_relationhsip_id = line[13]
-                pattern_relationship_id = r"rigid:([^|]+)"
-                match_relationship_id = re.search(
-                    pattern_relationship_id, input_relationhsip_id
-                )
+        taxa = [taxon_id] if isinstance(taxon_id, str) else list(taxon_id)
+        snapshot_path = self._snapshot_path(taxa, inputfile)
 
-                # Extract the matched value if found
-                if match_relationship_id:
-                    relationship_id = match_relationship_id.group(1)
-
-                else:
-                    relationship_id = ""
-
-                if taxon_id != "*":
-                    if (taxon_a, taxon_b) != (taxon_id, taxon_id):
-                        continue
-                
-
-                if (partner_a, partner_b) not in self.interactions:
-                    self.interactions[(partner_a, partner_b)] = Interaction(
-                        partner_a=partner_a,
-                        partner_b=partner_b,
-                        pmid={pmid} if pmid != "" else set(),
-                        method={method} if method != "" else set(),
-                        taxon_a={taxon_a} if taxon_a != "" else set(),
-                        taxon_b={taxon_b} if taxon_b != "" else set(),
-                        taxon_id = {taxon_id},
-                        relationship_id={relationship_id} if relationship_id != "" else set(),
+        if snapshot_path and os.path.isfile(os.path.join(snapshot_path, "snapshot.json")):
+            logger.info(f"Loading the parsed interactions from the snapshot {snapshot_path}")
+            for taxon in taxa:
+                self.interactions_by_taxon[taxon] = InteractionSnapshot(
+                    os.path.join(snapshot_path, self._snapshot_name(taxon))
+                )
+        else:
+            if self.workers > 1:
+                self._irefindex_process_parallel(taxon_id, inputfile)
+            else:
+                # Stream the file without unpacking it to disk
+                with closing(read_mitab(inputfile, self.read_buffer_size)) as file:
+                    parse_mitab_lines(
+                        file, taxon_id, self.interactions_by_taxon, self.new_table
                     )
-                else:
-                    if pmid != "":
-                        self.interactions[(partner_a, partner_b)].pmid.add(pmid)
-                    if method != "":
-                        self.interactions[(partner_a, partner_b)].method.add(method)
-                    if taxon_a != "":
-                        self.interactions[(partner_a, partner_b)].taxon_a.add(taxon_a)
-                    if taxon_b != "":
-                        self.interactions[(partner_a, partner_b)].taxon_b.add(taxon_b)
-                    if taxon_id != "":
-                        self.interactions[(partner_a, partner_b)].taxon_id.add(taxon_id)
-                    if relationship_id != "":
-                        self.interactions[(partner_a, partner_b)].relationship_id.add(relationship_id)
 
+            if snapshot_path:
+                self._save_snapshot(taxa, snapshot_path)
+
+        logger.info(
+            "--> Succesfully extracted information from the IRefIndex database!"
+        )
+
+        if isinstance(taxon_id, str):
+            self.interactions = self.interactions_by_taxon.setdefault(taxon_id, self.new_table())
+            return self.interactions
+
+        for taxon in taxon_id:
+            self.interactions_by_taxon.setdefault(taxon, self.new_table())
             logger.info(
-                "--> Succesfully extracted information from the IRefIndex database!"
+                f"Taxon {taxon}: {len(self.interactions_by_taxon[taxon])} interactions"
             )
 
-            return self.interactions
+        return self.interactions_by_taxon
+
+    def _snapshot_path(self, taxa: list, inputfile) -> Optional[str]:
+        """
+        Directory of the snapshot of the interactions of `taxa` in `inputfile`,
+        None if snapshots are disabled.
+        """
+        if not self.snapshot_directory:
+            return None
+        key = "-".join(
+            (
+                file_digest(inputfile),
+                ",".join(sorted(self._snapshot_name(taxon) for taxon in taxa)),
+                "reciprocal" if self.dedup_reciprocal else "directed",
+                f"v{SNAPSHOT_VERSION}",
+            )
+        )
+        return os.path.join(self.snapshot_directory, key)
+
+    @staticmethod
+    def _snapshot_name(taxon: str) -> str:
+        return "all" if taxon == "*" else taxon
+
+    def _save_snapshot(self, taxa: list, snapshot_path: str):
+        t0 = time()
+        # the taxa are saved in a temporary directory that is renamed when
+        # all of them are written
+        temporary_path = f"{snapshot_path}.tmp{os.getpid()}"
+        os.makedirs(temporary_path, exist_ok=True)
+        for taxon in taxa:
+            InteractionSnapshot.save(
+                self.interactions_by_taxon.setdefault(taxon, self.new_table()),
+                os.path.join(temporary_path, self._snapshot_name(taxon)),
+            )
+        # marks the snapshot as complete
+        with open(os.path.join(temporary_path, "snapshot.json"), "w") as file:
+            json.dump({"version": SNAPSHOT_VERSION, "taxa": taxa}, file)
+        if os.path.isdir(snapshot_path):
+            shutil.rmtree(snapshot_path)
+        os.replace(temporary_path, snapshot_path)
+        logger.info(
+            f"Saved the parsed interactions to the snapshot {snapshot_path} in {round(time() - t0, 2)} s"
+        )
+
+    def for_taxon(self, taxon_id: str) -> "IRefIndexAdapter":
+        """
+        Return an adapter with the same settings that generates the nodes and
+        edges of one taxon of a multi-taxon `irefindex_process` scan.
+        """
+        adapter = copy.copy(self)
+        adapter.interactions = self.interactions_by_taxon.get(taxon_id) or self.new_table()
+        adapter.interactions_by_taxon = {taxon_id: adapter.interactions}
+        return adapter
+
+    def _irefindex_process_parallel(self, taxon_id, inputfile):
+        """
+        Parse the IRefIndex file in a pool of `self.workers` processes. Each
+        worker parses a part of the file into partial interaction dicts, and
+        the partial results are merged in file order, which gives the same
+        interactions as the serial path.
+        """
+        logger.info(f"Parsing the IRefIndex file with {self.workers} workers")
+
+        if _is_compressed(inputfile):
+            # compressed files can not be split in byte ranges, so the rows
+            # are read here and sent to the workers in batches
+            reader = closing(read_mitab(inputfile, self.read_buffer_size))
+            with reader as file:
+                tasks = (
+                    (batch, taxon_id, None, self.new_table) for batch in _batched(file, MITAB_BATCH_SIZE)
+                )
+                self._merge_parallel_results(parse_mitab_lines, tasks)
+        else:
+            ranges = find_line_aligned_ranges(
+                inputfile, self.workers * RANGES_PER_WORKER
+            )
+            tasks = (
+                (inputfile, start, end, taxon_id, self.read_buffer_size, self.new_table)
+                for start, end in ranges
+            )
+            self._merge_parallel_results(_parse_mitab_byte_range, tasks)
+
+    def _merge_parallel_results(self, function, tasks):
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for partial in _ordered_map(
+                executor, function, tasks, max_pending=2 * self.workers
+            ):
+                merge_interactions(self.interactions_by_taxon, partial)
 
     def get_nodes(self):
         """
@@ -261,46 +1691,189 @@ class IRefIndexAdapter:
 
         t1 = time()
 
-        node_ids = set()
-        self.nodes= []
-        for (partners, interaction) in self.interactions.items():
-            for node_id in partners:
-                if node_id not in node_ids:
-                    node_ids.add(node_id)
-
-                    if node_id == interaction.partner_a:
-                        taxon_id = interaction.taxon_a
-                    if node_id == interaction.partner_b:
-                        taxon_id = interaction.taxon_b
-
-                    # for node_id in node_ids:
-                    #taxon_id = interaction.taxon_id
-                    pubmed_id = interaction.pmid
-                    method = interaction.method
-                    protein_type = f"{find_protein_type(node_id)}_protein"
-                    
-                    node_id = self.add_prefix_to_identifier(node_id)
-
-                    yield (
-                        node_id, protein_type, {
-                            "pubmed_ids": "|".join(pubmed_id),
-                            "taxon_id": "|".join(taxon_id),
-                            "method": "|".join(method),
-                        }
-                    )
+        # the properties of every protein were aggregated over all its
+        # interactions while parsing
+        for protein in self.interactions.proteins_properties():
+            node_id = protein.protein_id
+            protein_type = f"{self.identifiers.protein_type(node_id)}_protein"
+
+            node_id = self.add_prefix_to_identifier(node_id)
+
+            yield (
+                node_id, protein_type, {
+                    "pubmed_ids": "|".join(protein.pmid),
+                    "taxon_id": "|".join(protein.taxon),
+                    "method": "|".join(protein.method),
+                }
+            )
         t2 = time()
         logger.info(f"Nodes were generated in {round((t2-t1) / 60, 2)} mins")
+        self.identifiers.log_statistics()
+        self.curies.log_statistics()
+        self.curies.flush()
             
     
+    def get_edge_batches(
+        self,
+        label: str = "protein_protein_interaction",
+        batch_size: int = EDGE_BATCH_SIZE,
+    ):
+        """
+        Get edges from merged data in blocks of `batch_size` edges. Quotes are
+        escaped once per distinct pubmed id, method, taxon and relationship id
+        instead of once per occurrence.
+        Args:
+            label: label of protein-protein interaction edges --> Must be same as in the schema_config.yaml file
+            batch_size: number of edges per block
+        """
+        for method in self.interactions.methods.values:
+            assert "|" not in escape_quotes(method)
+
+        rows = self.interactions.property_lists(escape_quotes)
+        while True:
+            with _paused_gc():
+                batch = [
+                    (
+                        None,
+                        self.add_prefix_to_identifier(identifier=partner_a),
+                        self.add_prefix_to_identifier(identifier=partner_b),
+                        label,
+                        {
+                            "pubmed_ids": pmid,
+                            "method": method,
+                            "taxon_a": taxon_a,
+                            "taxon_b": taxon_b,
+                            "relationship_id": relationship_id,
+                        },
+                    )
+                    for (
+                        partner_a,
+                        partner_b,
+                        pmid,
+                        method,
+                        taxon_a,
+                        taxon_b,
+                        relationship_id,
+                    ) in islice(rows, batch_size)
+                ]
+            if not batch:
+                break
+            yield batch
+
+    def write_neo4j_import(
+        self,
+        bc,
+        chunk_size: int = NEO4J_IMPORT_CHUNK_SIZE,
+        shards: int = NEO4J_IMPORT_SHARDS,
+        index_path: Optional[str] = None,
+    ):
+        """
+        Write the nodes and edges straight to neo4j-admin import CSV files, in
+        the format of the BioCypher instance `bc`. This replaces
+        `bc.write_nodes(adapter.get_nodes())` and `bc.write_edges(adapter.get_edges())`,
+        `bc.write_import_call()` is still called afterwards.
+        Args:
+            bc: BioCypher instance with neo4j output
+            chunk_size: number of rows per part file
+            shards: number of shards, each formatted and written to its own part files by a separate process
+            index_path: if given, the fingerprint index of this build is computed while writing and saved
+                there, the input of the next `write_delta`
+        """
+        t5 = time()
+        writer = Neo4jImportWriter(bc, chunk_size, shards)
+        nodes = self.get_nodes()
+        edges = chain.from_iterable(self.get_edge_batches())
+        if index_path:
+            recorder = FingerprintRecorder()
+            nodes = recorder.nodes(nodes)
+            edges = recorder.edges(edges)
+        nodes = writer.write_nodes(nodes)
+        edges = writer.write_edges(edges)
+        if index_path:
+            recorder.index().save(index_path)
+        t6 = time()
+        logger.info(
+            f"Wrote {nodes} nodes and {edges} edges in {round((t6-t5) / 60, 2)} mins"
+        )
+
+    def save_fingerprints(self, index_path: str) -> FingerprintIndex:
+        """
+        Save the fingerprint index of this build (ids and property hashes of
+        all nodes and edges), the input of the next `write_delta`. This takes
+        a pass over the nodes and edges, `write_neo4j_import` saves the index
+        while writing them.
+        """
+        index = FingerprintIndex.build(
+            self.get_nodes(), chain.from_iterable(self.get_edge_batches())
+        )
+        index.save(index_path)
+        return index
+
+    def write_delta(
+        self,
+        previous_index_path: str,
+        output_directory: str,
+        bc,
+        index_path: Optional[str] = None,
+        batch_size: int = DELTA_BATCH_SIZE,
+    ) -> dict:
+        """
+        Write only the nodes and edges that were added, removed or changed since
+        the build of `previous_index_path`, as batches of Cypher statements that
+        update the graph of that build in place.
+        Args:
+            previous_index_path: fingerprint index saved by the previous build
+            output_directory: directory of the Cypher files
+            bc: BioCypher instance of the graph, the labels of the nodes and the type of the edges are taken
+                from its schema and ontology
+            index_path: where the fingerprint index of this build is saved, by default over `previous_index_path`
+            batch_size: number of rows per Cypher statement
+        Returns:
+            number of rows per Cypher file
+        """
+        t7 = time()
+        previous = FingerprintIndex.load(previous_index_path)
+        # the first pass only hashes, the rows that changed are generated
+        # again in the second pass instead of being kept in memory
+        current = FingerprintIndex.build(
+            self.get_nodes(), chain.from_iterable(self.get_edge_batches())
+        )
+        edge_label = IRefIndexEdgeType.PROTEIN_PROTEIN_INTERACTION.value
+        property_types = {
+            label: biocypher_property_types(bc, label)
+            for label in (*PROTEIN_NODE_LABELS, edge_label)
+        }
+        writer = CypherDeltaWriter(
+            output_directory,
+            biocypher_node_types(bc, PROTEIN_NODE_LABELS),
+            biocypher_edge_type(bc, edge_label),
+            {label: types for label, types in property_types.items() if types is not None},
+            get_biocypher_writer(bc).adelim,
+            batch_size,
+        )
+        counts = writer.write(
+            current,
+            previous,
+            self.get_nodes(),
+            chain.from_iterable(self.get_edge_batches()),
+        )
+        current.save(index_path or previous_index_path)
+        t8 = time()
+        logger.info(f"Delta was written in {round((t8-t7) / 60, 2)} mins")
+        return counts
+
     def add_prefix_to_identifier(self, identifier=None, sep=":") -> str:
         """
         Adds prefix to the protein id based on the identifier type
         """
 
         if self.add_prefix and identifier:
+            if sep == ":":
+                return self.identifiers.curie(identifier)
+
             prefix = find_protein_type(identifier) or ""
 
-            return normalize_curie(prefix + sep + str(identifier))
+            return self.curies.normalize(prefix + sep + str(identifier))
 
         return identifier
 
@@ -313,28 +1886,16 @@ class IRefIndexAdapter:
         logger.info("Generating edges.")
         t3 = time()
 
-
         # create edge list
-        for row in tqdm(
-            self.interactions.values()
-        ):
-            _source = self.add_prefix_to_identifier(identifier= row.partner_a)
-            _target = self.add_prefix_to_identifier(identifier=row.partner_b)
-
-            props = {
-                "pubmed_ids": [val.replace("'", "^") for val in row.pmid],
-                "method": [val.replace("'", "^") for val in row.method],
-                "taxon_a": [val.replace("'", "^") for val in row.taxon_a],
-                "taxon_b": [val.replace("'", "^") for val in row.taxon_b],
-                "relationship_id": [val.replace("'", "^") for val in row.relationship_id],
-            }
-
-            for m in props.get("method", []):
-                assert "|" not in m
-
-            yield (None, _source, _target, label, props)
+        with tqdm(total=len(self.interactions)) as progress:
+            for batch in self.get_edge_batches(label):
+                yield from batch
+                progress.update(len(batch))
         t4 = time()
         logger.info(f"Edges were generated in {round((t4-t3) / 60, 2)} mins")
+        self.identifiers.log_statistics()
+        self.curies.log_statistics()
+        self.curies.flush()
 
 
 
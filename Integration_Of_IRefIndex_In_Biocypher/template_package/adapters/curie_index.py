@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+from biocypher._logger import logger
+from typing import Optional
+from threading import Lock
+import atexit
+import os
+import sqlite3
+from bioregistry import normalize_curie
+from bioregistry.version import get_version as get_bioregistry_version
+
+
+logger.debug(f"Loading module {__name__}.")
+
+# The index lives in the cache directory of the project, next to the other
+# caches of BioCypher, and is shared by the IRefIndex and UniProt adapters.
+CURIE_INDEX_PATH = os.environ.get(
+    "CURIE_INDEX_PATH", os.path.join(".cache", "curie_index.sqlite")
+)
+
+# number of CURIEs kept in memory in front of the index
+CURIE_MEMORY_SIZE = 1_000_000
+# number of new CURIEs that are written to the index in one transaction
+CURIE_WRITE_BATCH_SIZE = 10_000
+# bytes of the index that SQLite reads through a memory map
+CURIE_MMAP_SIZE = 256 * 2**20
+
+
+class CurieIndex:
+    """
+    Normalization service for CURIEs, backed by an SQLite index on disk that
+    maps raw identifiers to their normalized CURIE.
+
+    `bioregistry.normalize_curie` is only called for identifiers that are not
+    in the index yet, its result (also when it is None) is added to the
+    index. Repeated builds therefore skip bioregistry entirely for identifiers
+    that were seen before. Recently used CURIEs are also kept in memory.
+
+    The index records the bioregistry version it was built with, and is
+    emptied when it is opened with another version, as the normalization of
+    an identifier can change between versions.
+
+    Args:
+        path: path of the SQLite index, created if it does not exist. With
+            None, the index only lives in memory.
+        memory_size: maximum number of CURIEs kept in memory.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = CURIE_INDEX_PATH,
+        memory_size: int = CURIE_MEMORY_SIZE,
+    ):
+        self.path = path
+        self.memory_size = memory_size
+        self.memory = {}
+        self.pending = []
+        self.hits = 0
+        self.index_hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(
+            path or ":memory:", check_same_thread=False
+        )
+        self.connection.execute(f"PRAGMA mmap_size = {CURIE_MMAP_SIZE}")
+        # several builds can read the index while one of them writes to it
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS curies ("
+            "identifier TEXT NOT NULL, sep TEXT NOT NULL, curie TEXT, "
+            "PRIMARY KEY (identifier, sep)) WITHOUT ROWID"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        self.connection.commit()
+        self._check_version()
+
+        atexit.register(self.close)
+
+    def _check_version(self):
+        version = get_bioregistry_version()
+        row = self.connection.execute(
+            "SELECT value FROM metadata WHERE key = 'bioregistry_version'"
+        ).fetchone()
+        if row is not None and row[0] == version:
+            return
+        if row is not None:
+            logger.info(
+                f"Emptying the CURIE index {self.path}, it was built with "
+                f"bioregistry {row[0]} instead of {version}"
+            )
+        try:
+            with self.connection:
+                self.connection.execute("DELETE FROM curies")
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO metadata (key, value) "
+                    "VALUES ('bioregistry_version', ?)",
+                    (version,),
+                )
+        except sqlite3.OperationalError as error:
+            logger.warning(f"Could not reset the CURIE index {self.path}: {error}")
+
+    def normalize(self, identifier: str, sep: str = ":") -> Optional[str]:
+        """
+        Return the normalized CURIE of `identifier` ("prefix" + sep + "id"),
+        like `bioregistry.normalize_curie`.
+        """
+        key = (identifier, sep)
+        try:
+            curie = self.memory[key]
+            self.hits += 1
+            return curie
+        except KeyError:
+            pass
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT curie FROM curies WHERE identifier = ? AND sep = ?", key
+            ).fetchone()
+
+            if row is not None:
+                self.index_hits += 1
+                curie = row[0]
+            else:
+                self.misses += 1
+                curie = normalize_curie(identifier, sep=sep)
+                self.pending.append((identifier, sep, curie))
+                if len(self.pending) >= CURIE_WRITE_BATCH_SIZE:
+                    self._flush()
+
+            if len(self.memory) >= self.memory_size:
+                # drop the CURIE that was added first
+                del self.memory[next(iter(self.memory))]
+            self.memory[key] = curie
+
+        return curie
+
+    def _flush(self):
+        if not self.pending:
+            return
+        try:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO curies (identifier, sep, curie) VALUES (?, ?, ?)",
+                    self.pending,
+                )
+        except sqlite3.OperationalError as error:
+            # the index is a cache, a build never fails because it is locked
+            logger.warning(f"Could not write to the CURIE index {self.path}: {error}")
+        self.pending = []
+
+    def flush(self):
+        """
+        Write the new CURIEs to the index.
+        """
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        if self.connection is None:
+            return
+        self.flush()
+        self.connection.close()
+        self.connection = None
+        atexit.unregister(self.close)
+
+    def __len__(self):
+        with self.lock:
+            self._flush()
+            return self.connection.execute("SELECT COUNT(*) FROM curies").fetchone()[0]
+
+    def log_statistics(self):
+        logger.info(
+            f"CURIE index: {self.hits} memory hits, {self.index_hits} index hits, "
+            f"{self.misses} bioregistry lookups"
+        )
+
+
+_curie_indexes = {}
+
+
+def get_curie_index(path: Optional[str] = CURIE_INDEX_PATH) -> CurieIndex:
+    """
+    Return the CURIE index of `path`, opened once per process and shared by
+    all adapters.
+    """
+    index = _curie_indexes.get(path)
+    if index is None or index.connection is None:
+        index = _curie_indexes[path] = CurieIndex(path)
+    return index
@@ -0,0 +1,540 @@
+#!/usr/bin/env python
+from biocypher._logger import logger
+from array import array
+from collections import deque
+from hashlib import blake2b
+from typing import Optional
+import os
+import numpy as np
+
+
+logger.debug(f"Loading module {__name__}.")
+
+# Number of rows per UNWIND statement in the Cypher update batches
+DELTA_BATCH_SIZE = 10_000
+
+# Odd multiplier that combines the keys of the partners of an edge into the
+# key of the pair, (a, b) and (b, a) get different keys
+PAIR_KEY_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+# Files of the Cypher update batches, in the order they have to be run
+DELTA_FILES = (
+    "1_nodes_upsert.cypher",
+    "2_edges_delete.cypher",
+    "3_edges_upsert.cypher",
+    "4_nodes_delete.cypher",
+)
+
+# schema types of which the neo4j import stores the values as numbers and
+# booleans, all other values are strings (or lists of strings for arrays)
+SCALAR_TYPES = ("int", "long", "integer", "float", "double", "dbl", "bool", "boolean")
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), "little")
+
+
+def _canonical(value) -> str:
+    """
+    Text of a property value that does not depend on the order of the values
+    of a set: lists and "|" separated strings are sorted.
+    """
+    if isinstance(value, list):
+        return "|".join(sorted(map(str, value)))
+    if isinstance(value, str):
+        return "|".join(sorted(value.split("|")))
+    return str(value)
+
+
+def _nodes_with_ids(nodes):
+    """
+    Nodes that the neo4j import writes: nodes without id are skipped.
+    """
+    return (node for node in nodes if node[0] is not None)
+
+
+def _edges_with_partners(edges):
+    """
+    Edges that the neo4j import writes: edges without source or target are
+    skipped.
+    """
+    return (edge for edge in edges if edge[1] is not None and edge[2] is not None)
+
+
+def fingerprint(label: str, properties: dict) -> int:
+    """
+    64 bit hash of the label and the properties of a node or an edge.
+    """
+    return _hash64(
+        "\t".join(
+            [label] + [f"{key}={_canonical(properties[key])}" for key in sorted(properties)]
+        ).encode()
+    )
+
+
+class FingerprintIndex:
+    """
+    Compact index of a build: per node a 64 bit hash of its id and a
+    fingerprint of its properties, per edge a 64 bit hash of its (source,
+    target) pair, of both partners and a fingerprint of its properties. Nodes
+    and edges are looked up by the hash of their id or pair; the saved arrays
+    are sorted on it. Nodes without id and edges without source or target are
+    not indexed, like the neo4j import skips them.
+
+    The ids themselves are only needed to remove the nodes and edges of a
+    previous build that are gone: node ids are kept as one UTF-8 buffer with
+    offsets, edge partners are found through the hashes of the node ids.
+    Edges of which a partner is not a node are not in the graph, neo4j-admin
+    import skips them, so they need no removal either.
+
+    Edges are keyed on the ordered (source, target) pair and not on their
+    RIGIDs: an edge holds the RIGIDs of all rows of its pair, and the graph
+    has one relationship per (source, target), which the import deduplicates
+    on and the Cypher batches match on. (a, b) and (b, a) are two
+    relationships, unless the adapter merges them with `dedup_reciprocal`.
+    RIGIDs that change are a change of the edge fingerprint.
+
+    It is stored as one .npz file, so the next release can be compared
+    against it without the previous MITAB file or graph.
+    """
+
+    arrays = (
+        "node_keys",
+        "node_hashes",
+        "node_id_offsets",
+        "node_id_bytes",
+        "edge_keys",
+        "edge_hashes",
+        "edge_source_keys",
+        "edge_target_keys",
+    )
+
+    def __init__(self, **arrays):
+        for name in self.arrays:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def build(cls, nodes, edges) -> "FingerprintIndex":
+        """
+        Index (id, label, properties) node tuples and (id, source, target,
+        label, properties) edge tuples.
+        """
+        recorder = FingerprintRecorder()
+        deque(recorder.nodes(nodes), maxlen=0)
+        deque(recorder.edges(edges), maxlen=0)
+        return recorder.index()
+
+    def node_id(self, position: int) -> str:
+        return self.node_id_bytes[
+            self.node_id_offsets[position] : self.node_id_offsets[position + 1]
+        ].tobytes().decode()
+
+    def edge_partners(self, position: int) -> Optional[tuple[str, str]]:
+        """
+        Ids of the partners of an edge of a saved index, None if a partner is
+        not a node.
+        """
+        partners = []
+        for key in (self.edge_source_keys[position], self.edge_target_keys[position]):
+            node = np.searchsorted(self.node_keys, key)
+            if node == len(self.node_keys) or self.node_keys[node] != key:
+                return None
+            partners.append(self.node_id(node))
+        return tuple(partners)
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # np.savez adds .npz to paths without it
+        temporary_path = path + ".tmp.npz"
+        node_order = np.argsort(self.node_keys, kind="stable")
+        edge_order = np.argsort(self.edge_keys, kind="stable")
+        node_id_offsets, node_id_bytes = _take_segments(
+            self.node_id_offsets, self.node_id_bytes, node_order
+        )
+        np.savez(
+            temporary_path,
+            node_keys=self.node_keys[node_order],
+            node_hashes=self.node_hashes[node_order],
+            node_id_offsets=node_id_offsets,
+            node_id_bytes=node_id_bytes,
+            **{
+                name: getattr(self, name)[edge_order]
+                for name in self.arrays
+                if name.startswith("edge")
+            },
+        )
+        os.replace(temporary_path, path)
+        logger.info(
+            f"Saved fingerprints of {len(self.node_keys)} nodes and {len(self.edge_keys)} edges to {path}"
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "FingerprintIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(**{name: data[name] for name in cls.arrays})
+
+    def changes(self, previous: "FingerprintIndex") -> dict:
+        """
+        Compare this build with the previous one.
+
+        Returns:
+            dict with boolean masks over the nodes and edges of this build that
+            are added or changed ("nodes_upsert", "edges_upsert"), and the
+            indices of the nodes and edges of `previous` that were removed
+            ("nodes_removed", "edges_removed").
+        """
+        result = {}
+        for kind in ("node", "edge"):
+            keys = getattr(self, f"{kind}_keys")
+            hashes = getattr(self, f"{kind}_hashes")
+            previous_keys = getattr(previous, f"{kind}_keys")
+            previous_hashes = getattr(previous, f"{kind}_hashes")
+
+            # previous arrays are sorted on the key
+            positions = np.searchsorted(previous_keys, keys)
+            positions = np.minimum(positions, max(len(previous_keys) - 1, 0))
+            if len(previous_keys):
+                found = previous_keys[positions] == keys
+                unchanged = found & (previous_hashes[positions] == hashes)
+            else:
+                unchanged = np.zeros(len(keys), dtype=bool)
+            result[f"{kind}s_upsert"] = ~unchanged
+            result[f"{kind}s_removed"] = np.flatnonzero(~np.isin(previous_keys, keys))
+
+        return result
+
+
+class FingerprintRecorder:
+    """
+    Builds the `FingerprintIndex` of the nodes and edges that pass through
+    `nodes` and `edges`, e.g. while the neo4j import writes them, so that the
+    index takes no pass over the adapter of its own. Everything is kept in
+    arrays of 64 bit hashes and one buffer of node ids.
+    """
+
+    def __init__(self):
+        self.node_keys = array("Q")
+        self.node_hashes = array("Q")
+        self.node_id_offsets = array("q", [0])
+        self.node_id_bytes = bytearray()
+        self.edge_hashes = array("Q")
+        self.edge_source_keys = array("Q")
+        self.edge_target_keys = array("Q")
+
+    def nodes(self, nodes):
+        """
+        Record and yield (id, label, properties) node tuples.
+        """
+        for node in nodes:
+            node_id, label, properties = node
+            if node_id is not None:
+                encoded = node_id.encode()
+                self.node_keys.append(_hash64(encoded))
+                self.node_hashes.append(fingerprint(label, properties))
+                self.node_id_bytes += encoded
+                self.node_id_offsets.append(len(self.node_id_bytes))
+            yield node
+
+    def edges(self, edges):
+        """
+        Record and yield (id, source, target, label, properties) edge tuples.
+        """
+        for edge in edges:
+            _, source, target, label, properties = edge
+            if source is not None and target is not None:
+                self.edge_source_keys.append(_hash64(source.encode()))
+                self.edge_target_keys.append(_hash64(target.encode()))
+                self.edge_hashes.append(fingerprint(label, properties))
+            yield edge
+
+    def index(self) -> FingerprintIndex:
+        source_keys = np.array(self.edge_source_keys, dtype=np.uint64)
+        target_keys = np.array(self.edge_target_keys, dtype=np.uint64)
+        return FingerprintIndex(
+            node_keys=np.array(self.node_keys, dtype=np.uint64),
+            node_hashes=np.array(self.node_hashes, dtype=np.uint64),
+            node_id_offsets=np.array(self.node_id_offsets, dtype=np.int64),
+            node_id_bytes=np.frombuffer(bytes(self.node_id_bytes), dtype=np.uint8),
+            edge_keys=_pair_keys(source_keys, target_keys),
+            edge_hashes=np.array(self.edge_hashes, dtype=np.uint64),
+            edge_source_keys=source_keys,
+            edge_target_keys=target_keys,
+        )
+
+
+def _pair_keys(source_keys, target_keys):
+    """
+    64 bit keys of ordered (source, target) pairs, from the keys of the
+    partners.
+    """
+    return source_keys * PAIR_KEY_MULTIPLIER ^ target_keys
+
+
+def _take_segments(offsets, buffer, order):
+    """
+    Offsets and buffer of the segments `buffer[offsets[i]:offsets[i + 1]]`
+    in the order of the indices `order`.
+    """
+    starts = offsets[:-1][order]
+    lengths = np.diff(offsets)[order]
+    new_offsets = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    positions = np.arange(new_offsets[-1]) - np.repeat(new_offsets[:-1] - starts, lengths)
+    return new_offsets, buffer[positions]
+
+
+def biocypher_node_types(bc, input_labels) -> dict:
+    """
+    Labels and preferred id that BioCypher gives to the nodes of each input
+    label. The labels are those of its neo4j writer: the ontology class of
+    the input label and its ancestors in PascalCase, sorted. Input labels
+    that are not in the schema are left out, BioCypher does not write their
+    nodes.
+
+    Like `get_biocypher_writer`, this uses the private translator and
+    ontology of BioCypher 0.5.
+
+    Returns:
+        dict of input label -> (labels, preferred id)
+    """
+    translator = bc._get_translator()
+    ontology = bc._get_ontology()
+    node_types = {}
+    for input_label in input_labels:
+        for node in translator.translate_nodes([("", input_label, {})]):
+            labels = {
+                translator.name_sentence_to_pascal(label)
+                for label in ontology.get_ancestors(node.get_label())
+            }
+            node_types[input_label] = (sorted(labels), node.get_preferred_id())
+    return node_types
+
+
+def biocypher_property_types(bc, input_label: str) -> Optional[dict]:
+    """
+    Properties of the schema of an input label with their type, e.g.
+    {"pubmed_ids": "str"}, None if the input label is not in the schema.
+    BioCypher only writes these properties, and leaves out the others.
+    """
+    ontology_class = bc._get_translator()._get_ontology_mapping(input_label)
+    if ontology_class is None:
+        return None
+    return dict(bc._get_ontology().mapping.extended_schema[ontology_class].get("properties") or {})
+
+
+def biocypher_edge_type(bc, input_label: str) -> Optional[str]:
+    """
+    Relationship type that the neo4j writer of BioCypher gives to the edges
+    of an input label, None if the input label is not in the schema.
+    """
+    translator = bc._get_translator()
+    for edge in translator.translate_edges([(None, "", "", input_label, {})]):
+        return translator.name_sentence_to_pascal(edge.get_label())
+    return None
+
+
+def _cypher_labels(labels) -> str:
+    return "".join(f":`{label}`" for label in labels)
+
+
+def schema_value(value, value_type: str, array_delimiter: str):
+    """
+    Value of a property as the neo4j import stores it: lists are joined with
+    the array delimiter, except for array types ("str[]", ...), of which the
+    values are a list; properties of other types than numbers and booleans
+    are strings.
+    """
+    if value is None:
+        return None
+    if value_type.endswith("[]"):
+        return value.split(array_delimiter) if isinstance(value, str) else list(value)
+    if isinstance(value, list):
+        return array_delimiter.join(map(str, value))
+    if value_type in SCALAR_TYPES:
+        return value
+    return str(value)
+
+
+def cypher_value(value) -> str:
+    """
+    Cypher literal of a string, number, list or dict.
+    """
+    if value is None:
+        return "null"
+    if isinstance(value, str):
+        return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"`{key}`: {cypher_value(item)}" for key, item in value.items()) + "}"
+    return "[" + ", ".join(cypher_value(item) for item in value) + "]"
+
+
+class CypherDeltaWriter:
+    """
+    Writes the changes between two builds as batches of Cypher statements
+    (one UNWIND statement per `batch_size` rows), in four files that are run
+    in order with e.g. `cypher-shell -f`.
+
+    Nodes get the labels and preferred id that BioCypher gives them (see
+    `biocypher_node_types`). They are matched on the labels that the nodes of
+    all input labels share, so the statements find the nodes of the import
+    and of earlier delta builds alike. Nodes and edges only get the properties
+    of the schema, with the values that the neo4j import stores (see
+    `schema_value`), so that updated and imported ones have the same types.
+
+    Args:
+        output_directory: directory of the Cypher files
+        node_types: labels and preferred id per node input label
+        edge_type: relationship type of the interactions
+        property_types: properties and their type per node and edge input label
+        array_delimiter: array delimiter of the neo4j import
+        batch_size: number of rows per statement
+    """
+
+    def __init__(
+        self,
+        output_directory: str,
+        node_types: dict,
+        edge_type: str,
+        property_types: dict,
+        array_delimiter: str = "|",
+        batch_size: int = DELTA_BATCH_SIZE,
+    ):
+        if not node_types:
+            raise ValueError("No node input label is in the schema")
+        self.output_directory = output_directory
+        self.node_types = node_types
+        self.match_labels = _cypher_labels(
+            sorted(set.intersection(*(set(labels) for labels, _ in node_types.values())))
+        )
+        self.edge_type = edge_type
+        self.property_types = property_types
+        self.array_delimiter = array_delimiter
+        self.batch_size = batch_size
+        os.makedirs(output_directory, exist_ok=True)
+
+    def write(self, current: FingerprintIndex, previous: FingerprintIndex, nodes, edges) -> dict:
+        """
+        Write the delta between `previous` and `current`. `nodes` and `edges`
+        are the tuples `current` was built from, in the same order.
+
+        Returns:
+            number of rows per file
+        """
+        changes = current.changes(previous)
+        counts = {}
+        match = self.match_labels
+
+        upsert = changes["nodes_upsert"]
+        counts[DELTA_FILES[0]] = self._write(
+            DELTA_FILES[0],
+            (
+                (
+                    f"MERGE (n{match} {{id: row.id}}) SET n += row.properties, "
+                    f"n{_cypher_labels(self.node_types[label][0])}",
+                    {
+                        "id": node_id,
+                        "properties": {
+                            **self._properties(label, properties),
+                            "id": node_id,
+                            "preferred_id": self.node_types[label][1],
+                        },
+                    },
+                )
+                for i, (node_id, label, properties) in enumerate(_nodes_with_ids(nodes))
+                # BioCypher does not write nodes of labels that are not in the schema
+                if upsert[i] and label in self.node_types
+            ),
+        )
+
+        removed = changes["edges_removed"]
+        counts[DELTA_FILES[1]] = self._write(
+            DELTA_FILES[1],
+            (
+                (
+                    f"MATCH (n{match} {{id: row.source}})-[r:`{self.edge_type}`]->"
+                    f"(m{match} {{id: row.target}}) DELETE r",
+                    {"source": source, "target": target},
+                )
+                for source, target in filter(None, map(previous.edge_partners, removed))
+            ),
+        )
+
+        upsert = changes["edges_upsert"]
+        counts[DELTA_FILES[2]] = self._write(
+            DELTA_FILES[2],
+            (
+                (
+                    f"MATCH (a{match} {{id: row.source}}), (b{match} {{id: row.target}}) "
+                    f"MERGE (a)-[r:`{self.edge_type}`]->(b) SET r += row.properties",
+                    {
+                        "source": source,
+                        "target": target,
+                        "properties": self._properties(label, properties),
+                    },
+                )
+                for i, (_, source, target, label, properties) in enumerate(
+                    _edges_with_partners(edges)
+                )
+                # nor edges of labels that are not in the schema
+                if upsert[i] and label in self.property_types
+            ),
+        )
+
+        removed = changes["nodes_removed"]
+        counts[DELTA_FILES[3]] = self._write(
+            DELTA_FILES[3],
+            (
+                (
+                    f"MATCH (n{match} {{id: row.id}}) DETACH DELETE n",
+                    {"id": previous.node_id(i)},
+                )
+                for i in removed
+            ),
+        )
+
+        for name, count in counts.items():
+            logger.info(f"Delta {name}: {count} rows")
+        return counts
+
+    def _properties(self, label: str, properties: dict) -> dict:
+        """
+        Properties of the schema of an input label, as the neo4j import
+        stores them. Properties without value are set to null, which removes
+        them, like the import does not set them.
+        """
+        return {
+            name: schema_value(properties.get(name), value_type, self.array_delimiter)
+            for name, value_type in self.property_types[label].items()
+        }
+
+    def _write(self, name: str, rows) -> int:
+        """
+        Write (statement, row) pairs to a Cypher file, in batches of rows
+        per statement.
+        """
+        count = 0
+        batches = {}
+        with open(os.path.join(self.output_directory, name), "w") as file:
+            for statement, row in rows:
+                batch = batches.setdefault(statement, [])
+                batch.append(cypher_value(row))
+                count += 1
+                if len(batch) == self.batch_size:
+                    self._write_statement(file, batch, statement)
+                    batches[statement] = []
+            for statement, batch in batches.items():
+                if batch:
+                    self._write_statement(file, batch, statement)
+        return count
+
+    @staticmethod
+    def _write_statement(file, batch: list, statement: str):
+        file.write("UNWIND [\n")
+        file.write(",\n".join(batch))
+        file.write(f"\n] AS row\n{statement};\n")
@@ -0,0 +1,501 @@
+#!/usr/bin/env python
+from biocypher._logger import logger
+from zlib import crc32
+import glob
+import multiprocessing
+import os
+import re
+from typing import Optional
+
+
+logger.debug(f"Loading module {__name__}.")
+
+# Number of rows per part file written by Neo4jImportWriter
+NEO4J_IMPORT_CHUNK_SIZE = 1_000_000
+
+# Buffer size of the part files
+NEO4J_IMPORT_BUFFER_SIZE = 8 * 1024 * 1024
+
+# Number of shards (part files written in parallel, one process each). The
+# parent still deduplicates every row and sends it to its shard, which only
+# pays off with several CPUs; on one CPU, 2 and 4 shards took 2-3 times as
+# long as 1 shard for 300k edges.
+NEO4J_IMPORT_SHARDS = 1
+
+# Number of rows sent to a shard process at once, and number of these
+# batches that can wait in the queue of a shard
+SHARD_BATCH_SIZE = 10_000
+SHARD_QUEUE_SIZE = 4
+
+PART_NUMBER_PATTERN = re.compile(r"-part(\d+)\.csv$")
+
+# header types of which BioCypher writes the values unquoted, as str(value),
+# values of all other types (arrays included) are quoted
+UNQUOTED_TYPES = ("long", "double", "boolean")
+
+
+def available_cpus() -> int:
+    """
+    Number of CPUs this process can run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def get_biocypher_writer(bc):
+    """
+    Return the batch writer of a BioCypher instance in offline mode.
+
+    BioCypher has no public API for its writer: `_get_writer` and `_writer`
+    are private API of BioCypher 0.5, the version pinned in pyproject.toml
+    that the row layout, quoting and deduplication of `Neo4jImportWriter`
+    follow. The writer is created like `bc.write_nodes` does.
+    """
+    if not bc._writer:
+        bc._get_writer()
+    return bc._writer
+
+
+class RowTemplate:
+    """
+    Layout of the rows of one part file prefix, e.g. "Protein": what goes in
+    every column of the header written by BioCypher.
+
+    Every column is one of
+        ("id",) / ("source",) / ("target",) / ("edge_id",): raw identifiers,
+        ("quoted_id",): the node id as a quoted string property,
+        ("property", name, type): a property of the node or edge,
+        ("constant", token): a value that BioCypher derives from the schema
+            and the ontology (preferred id, labels, ...), copied from the
+            row that BioCypher wrote.
+    """
+
+    __slots__ = ("prefix", "columns")
+
+    def __init__(self, prefix: str, columns: list):
+        self.prefix = prefix
+        self.columns = columns
+
+    def fields(self, values: dict, properties: dict) -> tuple:
+        """
+        Values of the columns of a row that are not constants, unformatted,
+        see `RowFormatter.format_fields`.
+        """
+        return tuple(
+            properties.get(column[1]) if column[0] == "property" else values[column[0]]
+            for column in self.columns
+            if column[0] != "constant"
+        )
+
+
+class RowFormatter:
+    """
+    Formats rows of a `RowTemplate` with the delimiter, array delimiter and
+    quote character of the BioCypher writer, the same way as BioCypher: quote
+    characters inside values are not escaped.
+    """
+
+    def __init__(self, delim: str, adelim: str, quote: str):
+        self.delim = delim
+        self.adelim = adelim
+        self.quote = quote
+
+    def format_row(self, columns: list, values: dict, properties: dict) -> str:
+        fields = []
+        for column in columns:
+            kind = column[0]
+            if kind == "property":
+                fields.append(self.format_value(properties.get(column[1]), column[2]))
+            elif kind == "constant":
+                fields.append(column[1])
+            elif kind == "quoted_id":
+                fields.append(self.quote_string(str(values[kind])))
+            else:
+                fields.append(str(values[kind]))
+        return self.delim.join(fields) + "\n"
+
+    def format_fields(self, columns: list, fields: tuple) -> str:
+        """
+        Format a row of the values of `RowTemplate.fields`, like `format_row`.
+        """
+        fields = iter(fields)
+        row = []
+        for column in columns:
+            kind = column[0]
+            if kind == "property":
+                row.append(self.format_value(next(fields), column[2]))
+            elif kind == "constant":
+                row.append(column[1])
+            elif kind == "quoted_id":
+                row.append(self.quote_string(str(next(fields))))
+            else:
+                row.append(str(next(fields)))
+        return self.delim.join(row) + "\n"
+
+    def format_value(self, value, value_type: str) -> str:
+        if value is None:
+            return ""
+        if value_type in UNQUOTED_TYPES:
+            return str(value)
+        if isinstance(value, list):
+            return self.quote_string(self.adelim.join(map(str, value)))
+        return self.quote_string(str(value))
+
+    def quote_string(self, value: str) -> str:
+        return self.quote + value + self.quote
+
+
+def _write_shard(queue, formatter: RowFormatter):
+    """
+    Shard process: format the batches of rows received on `queue` (tuples of
+    `RowTemplate.fields`) and append them to their part file, until None is
+    received.
+    """
+    # open part file per prefix
+    files = {}
+    try:
+        for prefix, path, columns, rows in iter(queue.get, None):
+            current = files.get(prefix)
+            if current is None or current[0] != path:
+                if current is not None:
+                    current[1].close()
+                current = files[prefix] = (
+                    path,
+                    open(path, "w", buffering=NEO4J_IMPORT_BUFFER_SIZE),
+                )
+            current[1].writelines(formatter.format_fields(columns, fields) for fields in rows)
+    finally:
+        for _, file in files.values():
+            file.close()
+
+
+class Neo4jImportWriter:
+    """
+    Fast path to write nodes and edges as neo4j-admin import CSV files,
+    without converting every tuple to BioCypher objects.
+
+    The first node of every input label and the first edge are written by
+    BioCypher itself. That registers the header files and the import call in
+    `bc.write_import_call()`, and gives the exact layout of the rows, including
+    the values derived from the schema and the ontology (preferred id,
+    labels). All other rows are formatted with the delimiter, array delimiter
+    and quote character of the BioCypher writer, and written straight to the
+    next part files in chunks of `chunk_size` rows.
+
+    Duplicates are dropped like the deduplicator of BioCypher does: nodes on
+    their id, edges per part file prefix on their id or, without id, on
+    "source_target". Nodes without id and edges without source or target,
+    e.g. of identifiers that bioregistry can not normalize, are skipped.
+
+    With more than one shard, rows are distributed over the shards by a hash
+    of the node id or of the (sorted) pair of edge partners. The unformatted
+    values of the rows are sent to the shards in batches, every shard is
+    formatted and written by its own process into its own part files, which
+    neo4j-admin import loads together with the other parts. There are at most
+    as many shards as available CPUs, as the shards and the process that sends
+    them their rows otherwise take turns on the same CPUs.
+
+    Args:
+        bc: BioCypher instance with the neo4j output in CSV format
+        chunk_size: number of rows per part file
+        shards: number of shards written in parallel
+    """
+
+    def __init__(
+        self,
+        bc,
+        chunk_size: int = NEO4J_IMPORT_CHUNK_SIZE,
+        shards: int = NEO4J_IMPORT_SHARDS,
+    ):
+        self.bc = bc
+        self.chunk_size = chunk_size
+        self.shards = min(shards, available_cpus())
+        if self.shards < shards:
+            logger.warning(
+                f"Writing {self.shards} shards instead of {shards}, the number of available CPUs"
+            )
+
+        writer = get_biocypher_writer(bc)
+        self.outdir = writer.outdir
+        self.delim = writer.delim
+        self.adelim = writer.adelim
+        self.quote = writer.quote
+        self.csv = getattr(writer, "file_format", "csv") == "csv"
+        self.formatter = RowFormatter(self.delim, self.adelim, self.quote)
+
+        # template per (kind, input label), None for labels BioCypher skips
+        self.templates = {}
+        # rows per part file prefix that are not written yet
+        self.buffers = {}
+        self.node_ids = set()
+        # ids of the edges per part file prefix
+        self.edge_ids = {}
+        # last part number given out per prefix
+        self.part_numbers = {}
+
+        # sharded mode: batch of rows and [path, number of rows] of the
+        # current part file per (prefix, shard), and a queue per shard
+        self.shard_batches = {}
+        self.shard_parts = {}
+        self.queues = []
+        self.processes = []
+
+    def write_nodes(self, nodes) -> int:
+        """
+        Write (id, label, properties) node tuples, return the number of rows.
+        """
+        if not self.csv:
+            logger.warning("The fast path only writes CSV, passing the nodes to BioCypher")
+            self.bc.write_nodes(nodes)
+            return 0
+
+        written = 0
+        for node in nodes:
+            node_id, label, properties = node
+            if node_id is None:
+                continue
+            # same as skip_duplicate_nodes
+            if node_id in self.node_ids:
+                continue
+            self.node_ids.add(node_id)
+
+            key = ("node", label)
+            if key not in self.templates:
+                self.templates[key] = self._sample(self.bc.write_nodes, node, "node")
+                written += self.templates[key] is not None
+                continue
+            template = self.templates[key]
+            if template is None:
+                continue
+
+            values = {"id": node_id, "quoted_id": node_id}
+            self._append(template, values, properties, node_id)
+            written += 1
+
+        self.flush()
+        return written
+
+    def write_edges(self, edges) -> int:
+        """
+        Write (id, source, target, label, properties) edge tuples, return the
+        number of rows.
+        """
+        if not self.csv:
+            logger.warning("The fast path only writes CSV, passing the edges to BioCypher")
+            self.bc.write_edges(edges)
+            return 0
+
+        written = 0
+        for edge in edges:
+            edge_id, source, target, label, properties = edge
+            # partners that could not be normalized
+            if source is None or target is None:
+                continue
+
+            key = ("edge", label)
+            if key not in self.templates:
+                template = self.templates[key] = self._sample(
+                    self.bc.write_edges, edge, "edge"
+                )
+                if template is not None:
+                    self._edge_seen(template, edge_id, source, target)
+                    written += 1
+                continue
+            template = self.templates[key]
+            if template is None:
+                continue
+            # same as the deduplicator of BioCypher
+            if self._edge_seen(template, edge_id, source, target):
+                continue
+
+            values = {"edge_id": edge_id or "", "source": source, "target": target}
+            pair = None
+            if self.shards > 1:
+                # (a, b) and (b, a) go to the same shard
+                pair = f"{source}\t{target}" if source <= target else f"{target}\t{source}"
+            self._append(template, values, properties, pair)
+            written += 1
+
+        self.flush()
+        return written
+
+    def _edge_seen(self, template: RowTemplate, edge_id, source, target) -> bool:
+        """
+        Add an edge to the ids of its prefix, return True if it was seen before.
+        """
+        edge_ids = self.edge_ids.setdefault(template.prefix, set())
+        key = edge_id or f"{source}_{target}"
+        if key in edge_ids:
+            return True
+        edge_ids.add(key)
+        return False
+
+    def flush(self):
+        """
+        Write all buffered rows to new part files, and wait until the shard
+        processes have written theirs.
+        """
+        for prefix in list(self.buffers):
+            self._write_part(prefix)
+
+        if self.shard_batches or self.processes:
+            for prefix, shard in list(self.shard_batches):
+                self._send(prefix, shard)
+            self._stop_shards()
+
+    def _append(
+        self, template: RowTemplate, values: dict, properties: dict, shard_key: Optional[str]
+    ):
+        if self.shards <= 1:
+            rows = self.buffers.setdefault(template.prefix, [])
+            rows.append(self.formatter.format_row(template.columns, values, properties))
+            if len(rows) >= self.chunk_size:
+                self._write_part(template.prefix)
+            return
+
+        shard = crc32(shard_key.encode()) % self.shards
+        key = (template.prefix, shard)
+        batch = self.shard_batches.get(key)
+        if batch is None:
+            batch = self.shard_batches[key] = (template.columns, [])
+        batch[1].append(template.fields(values, properties))
+        if len(batch[1]) >= SHARD_BATCH_SIZE:
+            self._send(template.prefix, shard)
+
+    def _send(self, prefix: str, shard: int):
+        """
+        Send the batch of rows of a (prefix, shard) to its shard process.
+        """
+        columns, rows = self.shard_batches.pop((prefix, shard))
+        if not rows:
+            return
+
+        # the shard starts a new part file when the current one is full
+        part = self.shard_parts.get((prefix, shard))
+        if part is None or part[1] + len(rows) > self.chunk_size:
+            part = self.shard_parts[(prefix, shard)] = [self._next_part_path(prefix), 0]
+            logger.info(f"Writing shard {shard} to {os.path.basename(part[0])}")
+        part[1] += len(rows)
+
+        if not self.processes:
+            self._start_shards()
+        self.queues[shard].put((prefix, part[0], columns, rows))
+
+    def _start_shards(self):
+        for _ in range(self.shards):
+            queue = multiprocessing.Queue(SHARD_QUEUE_SIZE)
+            process = multiprocessing.Process(
+                target=_write_shard, args=(queue, self.formatter), daemon=True
+            )
+            process.start()
+            self.queues.append(queue)
+            self.processes.append(process)
+
+    def _stop_shards(self):
+        for queue in self.queues:
+            queue.put(None)
+        failed = []
+        for shard, process in enumerate(self.processes):
+            process.join()
+            if process.exitcode != 0:
+                failed.append(shard)
+        self.queues = []
+        self.processes = []
+        self.shard_parts = {}
+        if failed:
+            raise RuntimeError(f"Shards {failed} failed to write their part files")
+
+    def _part_files(self) -> set:
+        return set(glob.glob(os.path.join(self.outdir, "*-part*.csv")))
+
+    def _sample(self, write, item, kind: str):
+        """
+        Let BioCypher write one node or edge and derive the template of its
+        part file prefix from the header and the row that were written.
+        """
+        before = self._part_files()
+        write([item])
+        new_files = sorted(self._part_files() - before)
+        if not new_files:
+            label = item[1] if kind == "node" else item[3]
+            logger.info(f"BioCypher did not write the {kind} label {label}, skipping it")
+            return None
+
+        part_file = new_files[0]
+        prefix = PART_NUMBER_PATTERN.sub("", os.path.basename(part_file))
+        with open(os.path.join(self.outdir, f"{prefix}-header.csv")) as file:
+            header = file.readline().rstrip("\n").split(self.delim)
+        with open(part_file) as file:
+            tokens = self._split_row(file.readline().rstrip("\n"))
+        if len(tokens) != len(header):
+            raise ValueError(f"Row of {part_file} does not match its header")
+
+        properties = item[-1]
+        columns = []
+        for name, token in zip(header, tokens):
+            property_name, _, value_type = name.partition(":")
+            if kind == "node" and name == ":ID":
+                columns.append(("id",))
+            elif kind == "node" and property_name == "id":
+                columns.append(("quoted_id",))
+            elif kind == "edge" and name == ":START_ID":
+                columns.append(("source",))
+            elif kind == "edge" and name == ":END_ID":
+                columns.append(("target",))
+            elif kind == "edge" and property_name == "id":
+                columns.append(("edge_id",))
+            elif property_name and property_name in properties:
+                columns.append(("property", property_name, value_type))
+            else:
+                columns.append(("constant", token))
+
+        return RowTemplate(prefix, columns)
+
+    def _split_row(self, line: str) -> list[str]:
+        """
+        Split a row on the delimiter, keeping quoted fields as they are. A
+        quoted field ends at a quote character followed by the delimiter or
+        the end of the row.
+        """
+        tokens = []
+        position = 0
+        while True:
+            if line.startswith(self.quote, position):
+                end = position + 1
+                while True:
+                    end = line.index(self.quote, end) + 1
+                    if end == len(line) or line.startswith(self.delim, end):
+                        break
+            else:
+                end = line.find(self.delim, position)
+                if end == -1:
+                    end = len(line)
+            tokens.append(line[position:end])
+            if end >= len(line):
+                return tokens
+            position = end + len(self.delim)
+
+    def _write_part(self, prefix: str):
+        rows = self.buffers.pop(prefix, None)
+        if not rows:
+            return
+
+        path = self._next_part_path(prefix)
+        logger.info(f"Writing {len(rows)} entries to {os.path.basename(path)}")
+        with open(path, "w", buffering=NEO4J_IMPORT_BUFFER_SIZE) as file:
+            file.writelines(rows)
+
+    def _next_part_path(self, prefix: str) -> str:
+        """
+        Path of the next part file of a prefix, after the parts that BioCypher
+        wrote and the parts given out by this writer (shard processes create
+        their files later).
+        """
+        numbers = [
+            int(PART_NUMBER_PATTERN.search(path).group(1))
+            for path in glob.glob(os.path.join(self.outdir, f"{glob.escape(prefix)}-part*.csv"))
+        ]
+        numbers.append(self.part_numbers.get(prefix, -1))
+        part = self.part_numbers[prefix] = max(numbers) + 1
+        return os.path.join(self.outdir, f"{prefix}-part{part:03d}.csv")
@@ -0,0 +1,91 @@
+import glob
+import os
+import pytest
+import yaml
+from biocypher import BioCypher
+
+PROJECT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIRECTORY = os.path.join(PROJECT_DIRECTORY, "tests", "data")
+
+MITAB_NUMBER_OF_COLUMNS = 54
+
+
+def mitab_row(
+    partner_a,
+    partner_b,
+    pmid="pubmed:1",
+    method='psi-mi:"MI:0018"(two hybrid)',
+    taxon_a="9606",
+    taxon_b="9606",
+    rigid="0" * 40,
+):
+    """
+    A row of an IRefIndex MITAB 2.6 file, with the columns that the adapter
+    reads and "-" in all other columns.
+    """
+    columns = ["-"] * MITAB_NUMBER_OF_COLUMNS
+    columns[6] = method
+    columns[8] = pmid
+    columns[9] = f"taxid:{taxon_a}(organism)"
+    columns[10] = f"taxid:{taxon_b}(organism)"
+    columns[13] = f"rigid:{rigid}|edgetype:X"
+    columns[38] = partner_a
+    columns[39] = partner_b
+    return "\t".join(columns)
+
+
+def read_part_files(directory):
+    """
+    Rows of the part files of a BioCypher output directory, per part file
+    prefix, split on the delimiter.
+    """
+    rows = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*-part*.csv"))):
+        prefix = os.path.basename(path).rpartition("-part")[0]
+        with open(path) as file:
+            rows.setdefault(prefix, []).extend(
+                line.rstrip("\n").split("\t") for line in file
+            )
+    return rows
+
+
+@pytest.fixture
+def write_mitab(tmp_path):
+    """
+    Write MITAB rows to a file and return its path.
+    """
+
+    def write(rows, name="irefindex.mitab.txt"):
+        path = tmp_path / name
+        header = "#" + "\t".join(f"column{i}" for i in range(MITAB_NUMBER_OF_COLUMNS))
+        path.write_text("\n".join([header, *rows]) + "\n")
+        return str(path)
+
+    return write
+
+
+@pytest.fixture
+def create_biocypher(tmp_path, monkeypatch):
+    """
+    Create BioCypher instances with the configuration of the project, that
+    load a local copy of the ontology and write to `tmp_path`.
+    """
+    with open(os.path.join(PROJECT_DIRECTORY, "config", "biocypher_config.yaml")) as file:
+        config = yaml.safe_load(file)
+    config["biocypher"]["head_ontology"] = {
+        "url": os.path.join(DATA_DIRECTORY, "ontology.ttl"),
+        "root_node": "entity",
+    }
+    config_path = tmp_path / "biocypher_config.yaml"
+    config_path.write_text(yaml.safe_dump(config))
+    # caches are written to the current directory
+    monkeypatch.chdir(tmp_path)
+
+    def create(output_directory="biocypher-out"):
+        return BioCypher(
+            biocypher_config_path=str(config_path),
+            schema_config_path=os.path.join(PROJECT_DIRECTORY, "config", "schema_config.yaml"),
+            output_directory=str(tmp_path / output_directory),
+        )
+
+    return create
@@ -0,0 +1,196 @@
+import ast
+import os
+import re
+from template_package.adapters.delta import DELTA_FILES, FingerprintIndex
+from template_package.adapters.IRefIndex_adapter import IRefIndexAdapter
+from conftest import mitab_row, read_part_files
+
+
+def test_fingerprint_index_skips_missing_ids(tmp_path):
+    index = FingerprintIndex.build(
+        [
+            ("uniprot:P12345", "uniprot_protein", {"taxon_id": "9606"}),
+            (None, "None_protein", {"taxon_id": "9606"}),
+            ("uniprot:Q67890", "uniprot_protein", {"taxon_id": "9606"}),
+        ],
+        [
+            (None, "uniprot:P12345", "uniprot:Q67890", "protein_protein_interaction", {}),
+            (None, "uniprot:Q67890", "uniprot:P12345", "protein_protein_interaction", {}),
+            (None, "uniprot:P12345", None, "protein_protein_interaction", {}),
+            (None, None, "uniprot:Q67890", "protein_protein_interaction", {}),
+            # a partner that is not a node
+            (None, "uniprot:P12345", "uniprot:O11111", "protein_protein_interaction", {}),
+        ],
+    )
+    path = str(tmp_path / "fingerprints.npz")
+    index.save(path)
+    index = FingerprintIndex.load(path)
+
+    assert sorted(map(index.node_id, range(len(index.node_keys)))) == [
+        "uniprot:P12345",
+        "uniprot:Q67890",
+    ]
+    assert sorted(map(index.edge_partners, range(len(index.edge_keys))), key=str) == [
+        ("uniprot:P12345", "uniprot:Q67890"),
+        ("uniprot:Q67890", "uniprot:P12345"),
+        None,
+    ]
+
+
+def test_import_saves_the_fingerprints(create_biocypher, write_mitab, tmp_path):
+    adapter = IRefIndexAdapter(curie_index_path=None)
+    adapter.irefindex_process(
+        "9606",
+        [
+            write_mitab(
+                [
+                    mitab_row("uniprotkb:P12345", "uniprotkb:Q67890"),
+                    mitab_row("uniprotkb:P12345", "entrezgene/locuslink:7157"),
+                ]
+            )
+        ],
+    )
+    adapter.write_neo4j_import(create_biocypher(), index_path=str(tmp_path / "import.npz"))
+    adapter.save_fingerprints(str(tmp_path / "fingerprints.npz"))
+
+    written = FingerprintIndex.load(str(tmp_path / "import.npz"))
+    saved = FingerprintIndex.load(str(tmp_path / "fingerprints.npz"))
+    for name in FingerprintIndex.arrays:
+        assert (getattr(written, name) == getattr(saved, name)).all()
+
+
+def test_write_delta(create_biocypher, write_mitab, tmp_path):
+    index_path = str(tmp_path / "fingerprints.npz")
+    adapter = IRefIndexAdapter(curie_index_path=None)
+    adapter.irefindex_process(
+        "9606",
+        [
+            write_mitab(
+                [
+                    mitab_row("uniprotkb:P12345", "uniprotkb:Q67890"),
+                    mitab_row("uniprotkb:P12345", "uniprotkb:O11111"),
+                ],
+                name="release_1.txt",
+            )
+        ],
+    )
+    adapter.save_fingerprints(index_path)
+
+    adapter = IRefIndexAdapter(curie_index_path=None)
+    adapter.irefindex_process(
+        "9606",
+        [
+            write_mitab(
+                [
+                    # changed: a new publication
+                    mitab_row("uniprotkb:P12345", "uniprotkb:Q67890", pmid="pubmed:2"),
+                    # added, with a partner that can not be normalized
+                    mitab_row("uniprotkb:P12345", "entrezgene/locuslink:7157"),
+                ],
+                name="release_2.txt",
+            )
+        ],
+    )
+    delta_directory = str(tmp_path / "delta")
+    counts = adapter.write_delta(index_path, delta_directory, create_biocypher())
+
+    assert counts == {
+        "1_nodes_upsert.cypher": 2,
+        "2_edges_delete.cypher": 1,
+        "3_edges_upsert.cypher": 1,
+        "4_nodes_delete.cypher": 1,
+    }
+    statements = {}
+    for name in DELTA_FILES:
+        with open(os.path.join(delta_directory, name)) as file:
+            statements[name] = file.read()
+
+    # nodes get the labels and the preferred id of the schema, and are
+    # matched on the labels that all protein nodes have
+    assert (
+        "MERGE (n:`Entity`:`Protein` {id: row.id}) SET n += row.properties, "
+        "n:`Entity`:`Protein`:`Uniprot.Protein`;" in statements["1_nodes_upsert.cypher"]
+    )
+    assert "`preferred_id`: 'uniprot'" in statements["1_nodes_upsert.cypher"]
+    assert "None" not in statements["1_nodes_upsert.cypher"]
+    assert (
+        "MATCH (n:`Entity`:`Protein` {id: row.source})-[r:`Protein_protein_interaction`]->"
+        "(m:`Entity`:`Protein` {id: row.target}) DELETE r;"
+        in statements["2_edges_delete.cypher"]
+    )
+    assert "'uniprot:O11111'" in statements["2_edges_delete.cypher"]
+    assert "'uniprot:Q67890'" in statements["3_edges_upsert.cypher"]
+    assert "'uniprot:O11111'" in statements["4_nodes_delete.cypher"]
+    assert os.path.isfile(index_path)
+
+
+def read_delta_rows(path):
+    """
+    Rows of the UNWIND statements of a Cypher file.
+    """
+    with open(path) as file:
+        return [
+            ast.literal_eval(re.sub(r"`([^`]*)`:", r"'\1':", line.rstrip(",\n")))
+            for line in file
+            if line.startswith("{")
+        ]
+
+
+def read_import_properties(directory, prefix):
+    """
+    Properties of the rows of the part files of a prefix, by the columns of
+    its header, without the ids of neo4j-admin import, labels and types.
+    """
+    with open(os.path.join(directory, f"{prefix}-header.csv")) as file:
+        header = file.readline().rstrip("\n").split("\t")
+    return [
+        {
+            name: value.strip("'") or None
+            for name, value in zip(header, row)
+            if not name.startswith(":")
+        }
+        for row in read_part_files(directory)[prefix]
+    ]
+
+
+def test_delta_matches_import(create_biocypher, write_mitab, tmp_path):
+    index_path = str(tmp_path / "fingerprints.npz")
+    adapter = IRefIndexAdapter(curie_index_path=None)
+    adapter.irefindex_process(
+        "9606", [write_mitab([mitab_row("uniprotkb:P12345", "uniprotkb:Q67890")], name="release_1.txt")]
+    )
+    adapter.save_fingerprints(index_path)
+
+    # the edge gets two publications and methods, the neo4j import joins
+    # them with the array delimiter as the schema declares strings
+    release_2 = write_mitab(
+        [
+            mitab_row("uniprotkb:P12345", "uniprotkb:Q67890", pmid="pubmed:1"),
+            mitab_row(
+                "uniprotkb:P12345",
+                "uniprotkb:Q67890",
+                pmid="pubmed:2",
+                method='psi-mi:"MI:0007"(anti tag coimmunoprecipitation)',
+                rigid="1" * 40,
+            ),
+        ],
+        name="release_2.txt",
+    )
+    adapter = IRefIndexAdapter(curie_index_path=None)
+    adapter.irefindex_process("9606", [release_2])
+    delta_directory = str(tmp_path / "delta")
+    adapter.write_delta(index_path, delta_directory, create_biocypher("delta-out"))
+
+    bc = create_biocypher()
+    adapter.write_neo4j_import(bc)
+
+    [delta_edge] = read_delta_rows(os.path.join(delta_directory, "3_edges_upsert.cypher"))
+    [import_edge] = read_import_properties(bc._output_directory, "Protein_protein_interaction")
+    assert delta_edge["properties"] == import_edge
+    assert "|" in import_edge["pubmed_ids"] and "|" in import_edge["method"]
+
+    delta_nodes = read_delta_rows(os.path.join(delta_directory, "1_nodes_upsert.cypher"))
+    import_nodes = read_import_properties(bc._output_directory, "Uniprot.Protein")
+    assert sorted(
+        (row["id"], {**row["properties"], "id": row["id"]}) for row in delta_nodes
+    ) == sorted((node["id"], node) for node in import_nodes)
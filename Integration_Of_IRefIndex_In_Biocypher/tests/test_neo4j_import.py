@@ -0,0 +1,79 @@
+import pytest
+from template_package.adapters import neo4j_import
+from template_package.adapters.IRefIndex_adapter import IRefIndexAdapter
+from template_package.adapters.neo4j_import import Neo4jImportWriter
+from conftest import mitab_row, read_part_files
+
+
+@pytest.fixture(autouse=True)
+def cpus(monkeypatch):
+    """
+    Shards are tested whatever the number of CPUs of the machine.
+    """
+    monkeypatch.setattr(neo4j_import, "available_cpus", lambda: 4)
+
+
+def test_shards_are_limited_to_the_cpus(create_biocypher, monkeypatch):
+    monkeypatch.setattr(neo4j_import, "available_cpus", lambda: 2)
+    assert Neo4jImportWriter(create_biocypher(), shards=3).shards == 2
+    assert Neo4jImportWriter(create_biocypher(), shards=1).shards == 1
+
+
+@pytest.mark.parametrize("shards", [1, 3])
+def test_rows_match_biocypher(create_biocypher, shards):
+    nodes = [
+        (f"uniprot:P{i:05d}", "uniprot_protein", {"pubmed_ids": f"1|{i}", "taxon_id": "9606", "method": "it's"})
+        for i in range(50)
+    ]
+    # duplicates are dropped by both writers
+    nodes += nodes[:5]
+    edges = [
+        (None, f"uniprot:P{i % 50:05d}", f"uniprot:P{i * 7 % 50:05d}", "protein_protein_interaction", {"relationship_id": f"r{i % 60}"})
+        for i in range(200)
+    ]
+
+    bc = create_biocypher("biocypher")
+    bc.write_nodes(nodes)
+    bc.write_edges(edges)
+
+    fast = create_biocypher("fast")
+    writer = Neo4jImportWriter(fast, chunk_size=17, shards=shards)
+    writer.write_nodes(nodes)
+    writer.write_edges(edges)
+
+    expected = read_part_files(bc._output_directory)
+    rows = read_part_files(fast._output_directory)
+    assert {prefix: sorted(lines) for prefix, lines in rows.items()} == {
+        prefix: sorted(lines) for prefix, lines in expected.items()
+    }
+    assert len(rows["Protein_protein_interaction"]) == 50
+
+
+@pytest.mark.parametrize("shards", [1, 2])
+def test_partners_that_can_not_be_normalized_are_skipped(
+    create_biocypher, write_mitab, shards
+):
+    path = write_mitab(
+        [
+            mitab_row("uniprotkb:P12345", "uniprotkb:Q67890"),
+            # numeric gene ids have no protein type, bioregistry can not
+            # normalize them and their node id and edge target are None
+            mitab_row("uniprotkb:P12345", "entrezgene/locuslink:7157"),
+            mitab_row("entrezgene/locuslink:7157", "uniprotkb:Q67890"),
+        ]
+    )
+    adapter = IRefIndexAdapter(curie_index_path=None)
+    adapter.irefindex_process("9606", [path])
+    assert None in {node[0] for node in adapter.get_nodes()}
+
+    bc = create_biocypher()
+    adapter.write_neo4j_import(bc, shards=shards)
+
+    rows = read_part_files(bc._output_directory)
+    assert sorted(row[0] for row in rows["Uniprot.Protein"]) == [
+        "uniprot:P12345",
+        "uniprot:Q67890",
+    ]
+    assert [(row[0], row[-2]) for row in rows["Protein_protein_interaction"]] == [
+        ("uniprot:P12345", "uniprot:Q67890")
+    ]
@@ -0,0 +1,145 @@
+import gzip
+import os
+import zipfile
+from functools import partial
+import pytest
+from benchmark import (
+    extract_fields_with_re_search,
+    parse_into_dict,
+    split_all_columns,
+    write_synthetic_mitab,
+)
+from template_package.adapters.IRefIndex_adapter import (
+    ColumnarInteractionTable,
+    IRefIndexAdapter,
+    InteractionSnapshot,
+    InteractionStore,
+    extract_mitab_fields,
+    merge_interactions,
+    parse_mitab_lines,
+    read_mitab,
+    split_mitab_columns,
+)
+
+ENGINES = {"store": InteractionStore, "columnar": ColumnarInteractionTable}
+
+
+@pytest.fixture(scope="module")
+def mitab_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("mitab") / "synthetic.mitab.txt"
+    write_synthetic_mitab(str(path), 3000)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def lines(mitab_path):
+    return list(read_mitab(mitab_path))
+
+
+def normalized(table) -> tuple:
+    """
+    Interactions and proteins of a table, with the values of every property
+    sorted, as the order of values differs between the engines.
+    """
+    interactions = [
+        (partner_a, partner_b, *map(sorted, values))
+        for partner_a, partner_b, *values in table.property_lists()
+    ]
+    proteins = [
+        (protein.protein_id, sorted(protein.pmid), sorted(protein.method), sorted(protein.taxon))
+        for protein in table.proteins_properties()
+    ]
+    return interactions, proteins, list(table.items())
+
+
+def test_read_mitab_archives(mitab_path, lines, tmp_path):
+    zip_path = str(tmp_path / "synthetic.mitab.txt.zip")
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.write(mitab_path, os.path.basename(mitab_path))
+    gzip_path = str(tmp_path / "synthetic.mitab.txt.gz")
+    with open(mitab_path, "rb") as file, gzip.open(gzip_path, "wb") as compressed:
+        compressed.write(file.read())
+
+    assert list(read_mitab(zip_path, buffer_size=4096)) == lines
+    assert list(read_mitab(gzip_path, buffer_size=4096)) == lines
+
+
+def test_split_mitab_columns(lines):
+    for line in lines:
+        assert split_mitab_columns(line) == split_all_columns(line)
+
+
+def test_extract_mitab_fields(lines):
+    for line in lines:
+        assert extract_mitab_fields(line) == extract_fields_with_re_search(line)
+
+
+@pytest.mark.parametrize("taxa", ["9606", ["9606", "10090"]])
+def test_taxon_filter(lines, taxa):
+    selected = [taxa] if isinstance(taxa, str) else taxa
+    interactions = parse_mitab_lines(lines, taxa)
+
+    for taxon in selected:
+        # rows where both partners belong to the taxon
+        taxon_lines = [
+            line
+            for line in lines
+            if (fields := extract_fields_with_re_search(line)) is not None
+            and fields[4] == fields[5] == taxon
+        ]
+        expected = parse_mitab_lines(taxon_lines, taxon)[taxon]
+        assert list(interactions[taxon].items()) == list(expected.items())
+
+
+def test_store_matches_dict_of_sets(lines):
+    store = parse_mitab_lines(lines, "*")["*"]
+    assert dict(store.items()) == dict(parse_into_dict(lines).items())
+
+
+@pytest.mark.parametrize("reciprocal", [False, True])
+def test_columnar_matches_store(lines, reciprocal):
+    store, columnar = (
+        parse_mitab_lines(lines, "*", table=partial(engine, reciprocal=reciprocal))["*"]
+        for engine in ENGINES.values()
+    )
+    assert normalized(columnar) == normalized(store)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_merge_matches_whole_file(lines, engine):
+    table = ENGINES[engine]
+    whole = parse_mitab_lines(lines, ["9606", "10090"], table=table)
+
+    merged = {}
+    for start in range(0, len(lines), 700):
+        merge_interactions(
+            merged, parse_mitab_lines(lines[start : start + 700], ["9606", "10090"], table=table)
+        )
+
+    assert sorted(merged) == sorted(whole)
+    for taxon in whole:
+        assert normalized(merged[taxon]) == normalized(whole[taxon])
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_snapshot_matches_table(lines, engine, tmp_path):
+    table = parse_mitab_lines(lines, "*", table=ENGINES[engine])["*"]
+    path = str(tmp_path / "snapshot")
+    InteractionSnapshot.save(table, path)
+    snapshot = InteractionSnapshot(path)
+
+    assert normalized(snapshot) == normalized(table)
+    assert all(partners in snapshot for partners in table.keys())
+    assert [snapshot[partners] for partners in table.keys()] == list(table.values())
+
+
+def test_parallel_parsing_matches_serial(mitab_path):
+    adapters = []
+    for workers in (1, 2):
+        adapter = IRefIndexAdapter(workers=workers, curie_index_path=None)
+        adapter.irefindex_process("9606", [mitab_path])
+        adapters.append(adapter)
+
+    serial, parallel = adapters
+    assert list(parallel.get_nodes()) == list(serial.get_nodes())
+    assert list(parallel.get_edges()) == list(serial.get_edges())
@@ -10,7 +10,7 @@ import pandas as pd
 import numpy as np
 from time import time
 from typing import Optional
-from bioregistry import normalize_curie
+from .curie_index import get_curie_index
 from tqdm import tqdm # progress bar
 
 
@@ -432,7 +432,7 @@ class IRefIndexAdapter:
             else:
                 prefix= ""
 
-            return normalize_curie(prefix + sep + str(identifier))
+            return get_curie_index().normalize(prefix + sep + str(identifier))
         
         return identifier
         
@@ -3,13 +3,11 @@ import collections
 from typing import Optional, Union, Literal
 from collections.abc import Generator
 from enum import Enum, EnumMeta, auto
-from functools import lru_cache
 import pandas as pd
 import numpy as np
 
 import os
 import requests
-import h5py
 
 from tqdm import tqdm  # progress bar
 from pypath.share import curl, settings
@@ -17,12 +15,27 @@ from pypath.utils import mapping
 from pypath.inputs import uniprot
 from biocypher._logger import logger
 from contextlib import ExitStack
-from bioregistry import normalize_curie
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from .curie_index import CURIE_INDEX_PATH, get_curie_index
+from .embedding_store import EmbeddingStore, format_embedding
+from .uniprot_rest import UNIPROT_CACHE_DIRECTORY, UNIPROT_REST_URL, download_uniprot_fields
+from .protein_names import parse_protein_names, parse_protein_names_cached
 
 from pydantic import BaseModel, DirectoryPath, FilePath, HttpUrl, validate_call
 
 logger.debug(f"Loading module {__name__}.")
 
+# number of UniProt downloads that run at the same time
+DOWNLOAD_WORKERS = 4
+
+# directory of the cached ENST -> ENSG mapping tables
+ENST_ENSG_CACHE_DIRECTORY = os.path.join(".cache", "uniprot")
+
+# names of the downloads that are not a node field
+MULTI_FIELD_QUERY = "multi-field query"
+UNIPROT_IDS = "uniprot ids"
+
 
 class UniprotEnumMeta(EnumMeta):
     def __contains__(cls, item):
@@ -155,6 +168,8 @@ class UniProtModel(BaseModel):
     id_fields: Optional[Union[list[UniprotIDField], None]] = None
     add_prefix: bool = True
     test_mode: bool = False
+    curie_index_path: Optional[str] = CURIE_INDEX_PATH
+    cache_protein_names: bool = False
 
 
 class Uniprot:
@@ -164,13 +179,15 @@ class Uniprot:
 
     Args:
         organism: organism code in NCBI taxid format, e.g. "9606" for human.
-        rev: if True, it downloads swissprot (i.e., reviewed) entries only.
+        rev: if True, it downloads swissprot (i.e., reviewed) entries only, if False trembl (i.e., unreviewed) entries only.
         node_types: `UniprotNodeType` fields that will be included in graph, if it is None, select all fields.
         node_fields: `UniprotNodeField` fields that will be included in graph, if it is None, select all fields.
         edge_types: `UniprotEdgeType` fields that will be included in graph, if it is None, select all fields.
         id_fields: `UniprotIDField` field that will be included in graph as node identifier, if it is None, selects first 3 fields.
         add_prefix: if True, add prefix to database identifiers.
         test_mode: if True, limits amount of output data.
+        curie_index_path: SQLite index of normalized CURIEs, shared with the IRefIndex adapter. If it is None, the index only lives in memory.
+        cache_protein_names: if True, protein names are parsed with an LRU cache, which pays off when the same names are parsed again in the process, e.g. by several adapters.
     """
 
     def __init__(
@@ -183,6 +200,8 @@ class Uniprot:
         id_fields: Optional[Union[list[UniprotIDField], None]] = None,
         add_prefix: Optional[bool] = True,
         test_mode: Optional[bool] = False,
+        curie_index_path: Optional[str] = CURIE_INDEX_PATH,
+        cache_protein_names: Optional[bool] = False,
     ):
         model = UniProtModel(
             organism=organism,
@@ -193,6 +212,8 @@ class Uniprot:
             id_fields=id_fields,
             add_prefix=add_prefix,
             test_mode=test_mode,
+            curie_index_path=curie_index_path,
+            cache_protein_names=cache_protein_names,
         ).model_dump()
 
         # params
@@ -200,6 +221,9 @@ class Uniprot:
         self.rev = model["rev"]
         self.add_prefix = model["add_prefix"]
         self.test_mode = model["test_mode"]
+        self.curies = get_curie_index(model["curie_index_path"])
+        self.cache_protein_names = model["cache_protein_names"]
+        self._enst_ensg_table = None
 
         # provenance
         self.data_source = "uniprot"
@@ -254,6 +278,9 @@ class Uniprot:
         debug: bool = False,
         retries: int = 3,
         prott5_embedding_output_path: FilePath | None = None,
+        multi_field_query: bool = True,
+        uniprot_rest_url: str = UNIPROT_REST_URL,
+        download_workers: int = DOWNLOAD_WORKERS,
         #esm2_embedding_path: FilePath = "embeddings/esm2_t33_650M_UR50D_protein_embedding.h5",
     ):
         """
@@ -265,12 +292,17 @@ class Uniprot:
             forces download.
             debug: if True, turns on debug mode in pypath.
             retries: number of retries in case of download error.
+            multi_field_query: if True, all UniProt REST fields are downloaded
+            with one paginated query instead of one pypath call per field.
+            uniprot_rest_url: search endpoint of the UniProt REST API used by
+            the multi-field query.
+            download_workers: number of downloads that run at the same time.
         """
 
         # stack pypath context managers
         with ExitStack() as stack:
 
-            stack.enter_context(settings.context(retries=retries))
+            stack.enter_context(settings.context(curl_retries=retries))
 
             if debug:
                 stack.enter_context(curl.debug_on())
@@ -280,6 +312,11 @@ class Uniprot:
 
             self._download_uniprot_data(
                 prott5_embedding_output_path=prott5_embedding_output_path,
+                multi_field_query=multi_field_query,
+                uniprot_rest_url=uniprot_rest_url,
+                cache=cache,
+                retries=retries,
+                download_workers=download_workers,
                 #esm2_embedding_path=esm2_embedding_path
             )
 
@@ -290,32 +327,60 @@ class Uniprot:
     def _download_uniprot_data(
         self, 
         prott5_embedding_output_path: FilePath | None = None,
+        multi_field_query: bool = True,
+        uniprot_rest_url: str = UNIPROT_REST_URL,
+        cache: bool = False,
+        retries: int = 3,
+        download_workers: int = DOWNLOAD_WORKERS,
         #esm2_embedding_path: FilePath = "embeddings/esm2_t33_650M_UR50D_protein_embedding.h5",
     ):
         """
-        Download uniprot data from uniprot.org through pypath.
+        Download uniprot data from uniprot.org through pypath, or with one
+        multi-field query of the UniProt REST API. The downloads run
+        concurrently, see `_run_downloads`.
 
         Here is an overview of uniprot return fields:
         https://www.uniprot.org/help/return_fields
-
-        TODO make use of multi-field query
         """
 
         logger.info("Downloading uniprot data...")
 
         t0 = time()
 
-        # download all swissprot ids
-        self.uniprot_ids = set(uniprot._all_uniprots(self.organism, self.rev))
+        self.data = {}
 
-        # limit to 100 for testing
-        if self.test_mode:
-            self.uniprot_ids = set(list(self.uniprot_ids)[:100])
+        # fields that do not come from the uniprot REST fields
+        not_rest_fields = [
+            UniprotNodeField.ENSEMBL_GENE_IDS.value,
+            UniprotNodeField.PROTT5_EMBEDDING.value,
+            UniprotNodeField.SUBCELLULAR_LOCATION.value,
+            #UniprotNodeField.ESM2_EMBEDDING.value
+        ]
+
+        downloads = {}
+        if multi_field_query:
+            # all swissprot ids and attribute dicts in a single pass
+            rest_fields = [
+                field for field in self.node_fields if field not in not_rest_fields
+            ]
+            downloads[MULTI_FIELD_QUERY] = partial(
+                download_uniprot_fields,
+                rest_fields,
+                self.organism,
+                self.rev,
+                url=uniprot_rest_url,
+                cache_directory=UNIPROT_CACHE_DIRECTORY if cache else None,
+            )
+        else:
+            # download all swissprot ids
+            downloads[UNIPROT_IDS] = partial(
+                uniprot._all_uniprots, self.organism, self.rev
+            )
+            rest_fields = []
 
         # download attribute dicts
-        self.data = {}
-        for query_key in tqdm(self.node_fields):
-            if query_key in [
+        for query_key in self.node_fields:
+            if query_key in rest_fields or query_key in [
                 UniprotNodeField.ENSEMBL_GENE_IDS.value,
                 UniprotNodeField.PROTT5_EMBEDDING.value,
                 #UniprotNodeField.ESM2_EMBEDDING.value
@@ -323,15 +388,27 @@ class Uniprot:
                 continue
 
             elif query_key == UniprotNodeField.SUBCELLULAR_LOCATION.value:
-                self.data[query_key] = uniprot.uniprot_locations(
-                    self.organism, self.rev
+                downloads[query_key] = partial(
+                    uniprot.uniprot_locations, self.organism, self.rev
                 )
             else:
-                self.data[query_key] = uniprot.uniprot_data(
-                    query_key, self.organism, self.rev
+                downloads[query_key] = partial(
+                    uniprot.uniprot_data, query_key, self.organism, self.rev
                 )
 
-            logger.debug(f"{query_key} field is downloaded")
+        results = self._run_downloads(downloads, retries, download_workers)
+
+        if multi_field_query:
+            uniprot_ids, rest_data = results.pop(MULTI_FIELD_QUERY)
+            self.data.update(rest_data)
+        else:
+            uniprot_ids = results.pop(UNIPROT_IDS)
+        self.uniprot_ids = set(uniprot_ids)
+        self.data.update(results)
+
+        # limit to 100 for testing
+        if self.test_mode:
+            self.uniprot_ids = set(list(self.uniprot_ids)[:100])
 
         # add ensembl gene ids
         self.data[UniprotNodeField.ENSEMBL_GENE_IDS.value] = {}
@@ -350,18 +427,77 @@ class Uniprot:
         msg = f"Acquired UniProt data in {round((t1-t0) / 60, 2)} mins."
         logger.info(msg)
 
+    def _run_downloads(self, downloads: dict, retries: int, workers: int) -> dict:
+        """
+        Run the downloads (name -> function without arguments) in a pool of
+        `workers` threads, as they are I/O bound. A failed download is tried
+        again up to `retries` times in total, and the time of every download
+        is logged. Every attempt makes a single pypath request, so pypath's
+        own retries do not multiply the attempts.
+
+        Returns:
+            result per name, in the order of `downloads`
+        """
+
+        def run(name, download):
+            for attempt in range(1, max(retries, 1) + 1):
+                t0 = time()
+                try:
+                    result = download()
+                except Exception as error:
+                    if attempt >= retries:
+                        raise
+                    logger.warning(
+                        f"Download of {name} failed (attempt {attempt} of {retries}): {error}"
+                    )
+                    continue
+                logger.info(f"{name} is downloaded in {round(time() - t0, 2)} s")
+                return result
+
+        # the pypath settings are shared by all threads, they are set once for
+        # the pool and not per worker
+        with settings.context(curl_retries=1), ThreadPoolExecutor(
+            max_workers=max(workers, 1)
+        ) as executor:
+            futures = {
+                name: executor.submit(run, name, download)
+                for name, download in downloads.items()
+            }
+            for future in tqdm(as_completed(futures.values()), total=len(futures)):
+                future.result()
+
+        return {name: future.result() for name, future in futures.items()}
+
     @validate_call
     def download_prott5_embeddings(
-        self, prott5_embedding_output_path: FilePath | None = None
+        self,
+        prott5_embedding_output_path: FilePath | None = None,
+        consolidated_embedding_path: str | None = None,
     ):
         """
         Downloads ProtT5 embedding from uniprot website
         If the files exists in a defined file path, then
         directly read it.
 
+        The embeddings are not loaded in memory: an `EmbeddingStore` indexes
+        the ids in the file and reads the vectors when the nodes are generated.
+
         Args:
             prott5_embedding_output_path (FilePath, optional): Defaults to None.
+            consolidated_embedding_path (str, optional): .npy file the embeddings are copied to as one contiguous
+                float16 matrix, which is memory-mapped. If it exists, the embeddings are read from it instead of
+                the HDF5 file. Defaults to None.
         """
+        # only the proteins of the organism are indexed
+        uniprot_ids = getattr(self, "uniprot_ids", None)
+
+        if consolidated_embedding_path and os.path.isfile(consolidated_embedding_path):
+            logger.info("Consolidated ProtT5 embeddings exist. Reading from the matrix..")
+            self.data[UniprotNodeField.PROTT5_EMBEDDING.value] = EmbeddingStore.from_matrix(
+                consolidated_embedding_path, uniprot_ids
+            )
+            return
+
         url: HttpUrl = (
             "https://ftp.uniprot.org/pub/databases/uniprot/current_release/knowledgebase/embeddings/uniprot_sprot/per-protein.h5"
         )
@@ -381,23 +517,22 @@ class Uniprot:
         else:
             logger.info("ProtT5 Embedding file is exists. Reading from the file..")
 
-        with h5py.File(full_path, "r") as file:
-            for uniprot_id, embedding in file.items():
-                embedding = np.array(embedding).astype(np.float16)
-                count = np.count_nonzero(~np.isnan(embedding))
-                if (
-                    self.organism not in ("*", None)
-                    and uniprot_id in self.uniprot_ids
-                    and count == 1024
-                ):
-                    self.data[UniprotNodeField.PROTT5_EMBEDDING.value][
-                        uniprot_id
-                    ] = embedding
-                elif count == 1024:
-                    self.data[UniprotNodeField.PROTT5_EMBEDDING.value][
-                        uniprot_id
-                    ] = embedding
+        embeddings = EmbeddingStore(full_path, uniprot_ids)
+        if consolidated_embedding_path:
+            embeddings.consolidate(consolidated_embedding_path)
+        self.data[UniprotNodeField.PROTT5_EMBEDDING.value] = embeddings
                     
+    def export_prott5_embeddings(self, path: str):
+        """
+        Write the ProtT5 embeddings once as a float16 .npy matrix, with the
+        UniProt ids of its rows in a text file next to it, as a sidecar of the
+        graph that can be loaded with `numpy.load`.
+
+        Args:
+            path: path of the .npy file
+        """
+        self.data[UniprotNodeField.PROTT5_EMBEDDING.value].export(path)
+
     #@validate_call
     #def retrieve_esm2_embeddings(self, 
     #                             esm2_embedding_path: FilePath | None = "embeddings/esm2_t33_650M_UR50D_protein_embedding.h5") -> None:
@@ -479,10 +614,17 @@ class Uniprot:
             # ENST and ENSG ids
             if arg == UniprotNodeField.ENSEMBL_TRANSCRIPT_IDS.value:
 
+                # the transcripts of all proteins are mapped at once
+                enst_to_ensg = self._map_enst_to_ensg(
+                    enst.split(" [")[0].split(".")[0]
+                    for attribute_value in self.data.get(arg).values()
+                    for enst in self._ensure_iterable(attribute_value) or []
+                )
+
                 for protein, attribute_value in self.data.get(arg).items():
 
                     attribute_value, ensg_ids = self._find_ensg_from_enst(
-                        attribute_value
+                        attribute_value, enst_to_ensg
                     )
 
                     # update enst in data dict
@@ -597,7 +739,8 @@ class Uniprot:
     def get_edges(self, gene_to_protein_label: str = "Gene_encodes_protein",
                   protein_to_organism_label: str = "Protein_belongs_to_organism") -> Generator[tuple[None, str, str, str, dict]]:
         """
-        Get nodes and edges from UniProt data.
+        Yield edges (gene to protein, protein to organism) from UniProt data.
+        All edges share one properties dict.
         """
 
         logger.info(
@@ -605,9 +748,6 @@ class Uniprot:
             f"{[type.name for type in self.edge_types]}."
         )
 
-        # create lists of edges
-        edge_list = []
-
         # generic properties for all edges for now
         properties = {
             "source": self.data_source,
@@ -647,14 +787,12 @@ class Uniprot:
                             type_dict[id_type],
                             gene,
                         )
-                        edge_list.append(
-                            (
-                                None,
-                                gene_id,
-                                protein_id,
-                                gene_to_protein_label,
-                                properties,
-                            )
+                        yield (
+                            None,
+                            gene_id,
+                            protein_id,
+                            gene_to_protein_label,
+                            properties,
                         )
 
             if UniprotEdgeType.PROTEIN_TO_ORGANISM in self.edge_types:
@@ -679,20 +817,14 @@ class Uniprot:
                     organism_id = self.add_prefix_to_id(
                         "ncbitaxon", organism_id
                     )
-                    edge_list.append(
-                        (
-                            None,
-                            protein_id,
-                            organism_id,
-                            protein_to_organism_label,
-                            properties,
-                        )
+                    yield (
+                        None,
+                        protein_id,
+                        organism_id,
+                        protein_to_organism_label,
+                        properties,
                     )
 
-        if edge_list:
-
-            return edge_list
-
     def _reformat_and_filter_proteins(self):
         """
         For each uniprot id, select desired fields and reformat to give a tuple
@@ -815,7 +947,7 @@ class Uniprot:
                 )
 
             elif k == UniprotNodeField.PROTT5_EMBEDDING.value and all_props.get(k) is not None:
-                protein_props[k.replace(" ", "_").replace("-", "_")] = [str(emb) for emb in all_props[k]]
+                protein_props[k.replace(" ", "_").replace("-", "_")] = format_embedding(all_props[k])
 
             #elif k == UniprotNodeField.ESM2_EMBEDDING.value and all_props.get(k) is not None:
              #   protein_props[k.replace(" ", "_").replace("-", "_")] = [str(emb) for emb in all_props[k]]
@@ -884,88 +1016,27 @@ class Uniprot:
 
     def _split_protein_names_field(self, field_value):
         """
-        Split protein names field in uniprot
+        Split protein names field in uniprot, see `parse_protein_names`
         Args:
             field_value: entry of the protein names field
         Example:
             "Acetate kinase (EC 2.7.2.1) (Acetokinase)" -> ["Acetate kinase", "Acetokinase"]
         """
-        field_value = field_value.replace("|", ",").replace(
-            "'", "^"
-        )  # replace sensitive elements
-
-        if "[Cleaved" in field_value:
-            # discarding part after the "[Cleaved"
-            clip_index = field_value.index("[Cleaved")
-            protein_names = (
-                field_value[:clip_index].replace("(Fragment)", "").strip()
-            )
+        if not self.cache_protein_names:
+            return parse_protein_names(field_value)
 
-            # handling multiple protein names
-            if "(EC" in protein_names[0]:
-                splitted = protein_names[0].split(" (")
-                protein_names = []
-
-                for name in splitted:
-                    if not name.strip().startswith("EC") and not name.strip().startswith("Fragm"):
-                        protein_names.append(name.rstrip(")").strip())
-
-            elif " (" in protein_names[0]:
-                splitted = protein_names[0].split(" (")
-                protein_names = [
-                    name.rstrip(")").strip()
-                    for name in splitted
-                    if not name.strip().startswith("Fragm")
-                ]
-        elif "[Includes" in field_value:
-            # discarding part after the "[Includes"
-            clip_index = field_value.index("[Includes")
-            protein_names = (
-                field_value[:clip_index].replace("(Fragment)", "").strip()
-            )
-            # handling multiple protein names
-            if "(EC" in protein_names[0]:
-
-                splitted = protein_names[0].split(" (")
-                protein_names = [
-                    name.rstrip(")").strip()
-                    for name in splitted
-                    if not name.strip().startswith("EC")
-                    and not name.strip().startswith("Fragm")
-                ]
-            elif " (" in protein_names[0]:
-                splitted = protein_names[0].split(" (")
-                protein_names = [
-                    name.rstrip(")").strip()
-                    for name in splitted
-                    if not name.strip().startswith("Fragm")
-                ]
-        elif "(EC" in field_value.replace("(Fragment)", ""):
-            splitted = field_value.split(" (")
-            protein_names = [
-                name.rstrip(")").strip()
-                for name in splitted
-                if not name.strip().startswith("EC")
-                and not name.strip().startswith("Fragm")
-            ]
-        elif " (" in field_value.replace("(Fragment)", ""):
-            splitted = field_value.split(" (")
-            protein_names = [
-                name.rstrip(")").strip()
-                for name in splitted
-                if not name.strip().startswith("Fragm")
-            ]
-        else:
-            protein_names = field_value.replace("(Fragment)", "").strip()
+        protein_names = parse_protein_names_cached(field_value)
+        # the cached names are shared, every protein gets its own list
+        return protein_names if isinstance(protein_names, str) else list(protein_names)
 
-        return protein_names
-
-    def _find_ensg_from_enst(self, enst_list):
+    def _find_ensg_from_enst(self, enst_list, enst_to_ensg: dict | None = None):
         """
         take ensembl transcript ids, return ensembl gene ids by using pypath mapping tool
 
         Args:
             field_value: ensembl transcript list
+            enst_to_ensg: ensembl gene id per unversioned transcript id, see
+            `_map_enst_to_ensg`. If None, the transcripts of `enst_list` are mapped.
 
         """
 
@@ -973,14 +1044,14 @@ class Uniprot:
 
         enst_list = [enst.split(" [")[0] for enst in enst_list]
 
+        if enst_to_ensg is None:
+            enst_to_ensg = self._map_enst_to_ensg(
+                enst_id.split(".")[0] for enst_id in enst_list
+            )
+
         ensg_ids = set()
         for enst_id in enst_list:
-            ensg_id = list(
-                mapping.map_name(
-                    enst_id.split(".")[0], "enst_biomart", "ensg_biomart"
-                )
-            )
-            ensg_id = ensg_id[0] if ensg_id else None
+            ensg_id = enst_to_ensg.get(enst_id.split(".")[0])
             if ensg_id:
                 ensg_ids.add(ensg_id)
 
@@ -994,20 +1065,76 @@ class Uniprot:
 
         return enst_list, ensg_ids
 
-    @lru_cache
+    def _enst_to_ensg_table(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        ENST -> ENSG mapping table of pypath (BioMart) as two arrays, the
+        transcript ids sorted. The table is loaded once and cached on disk in
+        `ENST_ENSG_CACHE_DIRECTORY` between runs.
+        """
+        if self._enst_ensg_table is not None:
+            return self._enst_ensg_table
+
+        path = os.path.join(
+            ENST_ENSG_CACHE_DIRECTORY,
+            f"enst_to_ensg_{'all' if self.organism in ('*', None) else self.organism}.npz",
+        )
+        if os.path.isfile(path):
+            with np.load(path) as table:
+                self._enst_ensg_table = table["enst"], table["ensg"]
+            logger.info(f"Loaded {len(self._enst_ensg_table[0])} ENST -> ENSG mappings from {path}")
+            return self._enst_ensg_table
+
+        mapping_table = mapping.get_mapper().which_table(
+            "enst_biomart",
+            "ensg_biomart",
+            load=True,
+            ncbi_tax_id=None if self.organism in ("*", None) else self.organism,
+        )
+        pairs = sorted(
+            (enst, min(ensgs))
+            for enst, ensgs in (mapping_table.data.items() if mapping_table else [])
+            if ensgs
+        )
+        enst = np.array([pair[0] for pair in pairs], dtype=str)
+        ensg = np.array([pair[1] for pair in pairs], dtype=str)
+
+        os.makedirs(ENST_ENSG_CACHE_DIRECTORY, exist_ok=True)
+        np.savez(path, enst=enst, ensg=ensg)
+        logger.info(f"Saved {len(enst)} ENST -> ENSG mappings to {path}")
+
+        self._enst_ensg_table = enst, ensg
+        return self._enst_ensg_table
+
+    def _map_enst_to_ensg(self, enst_ids) -> dict:
+        """
+        Map unversioned ensembl transcript ids to ensembl gene ids in one
+        vectorized lookup in the mapping table.
+
+        Returns:
+            ensembl gene id per transcript id that is in the table
+        """
+        table_enst, table_ensg = self._enst_to_ensg_table()
+        enst_ids = np.unique(np.array(list(enst_ids), dtype=str))
+        if not enst_ids.size or not table_enst.size:
+            return {}
+
+        positions = np.minimum(np.searchsorted(table_enst, enst_ids), table_enst.size - 1)
+        found = table_enst[positions] == enst_ids
+        return dict(zip(enst_ids[found].tolist(), table_ensg[positions[found]].tolist()))
+
     def _normalise_curie_cached(
         self, prefix: str, identifier: str, sep: str = ":"
     ) -> Optional[str]:
         """
-        Wrapper to call and cache `normalize_curie()` from Bioregistry.
+        Wrapper to call `normalize_curie()` from Bioregistry through the
+        shared CURIE index.
         """
 
         if not self.normalise_curies:
             return identifier
 
-        return normalize_curie(f"{prefix}{sep}{identifier}", sep=sep)
+        return self.curies.normalize(f"{prefix}{sep}{identifier}", sep=sep)
 
-    @lru_cache
     @validate_call
     def add_prefix_to_id(
         self, prefix: str = None, identifier: str = None, sep: str = ":"
@@ -1016,7 +1143,7 @@ class Uniprot:
         Adds prefix to database id
         """
         if self.add_prefix and identifier:
-            return normalize_curie(prefix + sep + identifier)
+            return self.curies.normalize(prefix + sep + identifier)
 
         return identifier
 
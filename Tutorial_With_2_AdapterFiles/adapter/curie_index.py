@@ -0,0 +1 @@
+../../Integration_Of_IRefIndex_In_Biocypher/template_package/adapters/curie_index.py
\ No newline at end of file
@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+from biocypher._logger import logger
+from collections.abc import Iterable
+from typing import Optional
+from time import time
+import os
+import sys
+import numpy as np
+import h5py
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+logger.debug(f"Loading module {__name__}.")
+
+# length of a ProtT5 per-protein embedding
+PROTT5_EMBEDDING_DIMENSION = 1024
+
+# number of vectors read and validated at once
+EMBEDDING_BLOCK_SIZE = 4096
+
+
+def filter_ids(ids: np.ndarray, selection: Iterable[str]) -> np.ndarray:
+    """
+    Elements of `ids` that are in `selection`, with one binary search over the
+    sorted selection instead of a set lookup per id.
+    """
+    selection = np.sort(np.fromiter(selection, dtype=object).astype(str))
+    if not selection.size:
+        return ids[:0]
+    positions = np.minimum(np.searchsorted(selection, ids), selection.size - 1)
+    return ids[selection[positions] == ids]
+
+
+_float16_strings = None
+
+
+def format_embedding(embedding: np.ndarray) -> list[str]:
+    """
+    Text of the values of a float16 vector, as `str` gives them. The text of
+    all 65536 float16 values is built once, a vector is formatted with one
+    lookup of its bit patterns instead of a `str` call per value.
+    """
+    global _float16_strings
+    if _float16_strings is None:
+        values = np.arange(2**16, dtype=np.uint32).astype(np.uint16).view(np.float16)
+        _float16_strings = np.array([str(value) for value in values], dtype=object)
+    return _float16_strings[np.asarray(embedding, dtype=np.float16).view(np.uint16)].tolist()
+
+
+def peak_rss_mib() -> float:
+    """
+    Peak resident set size of the process in MiB. `ru_maxrss` is in KiB on
+    Linux and in bytes on macOS; without `resource` (Windows), the peak
+    working set of psutil is used.
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+    import psutil
+
+    memory = psutil.Process().memory_info()
+    return round(getattr(memory, "peak_wset", memory.rss) / 2**20, 1)
+
+
+class EmbeddingStore:
+    """
+    Lazy, read-only mapping of UniProt ids to float16 embedding vectors.
+
+    The HDF5 file (one dataset per protein, as `per-protein.h5` of UniProt)
+    is opened once and only the set of indexed ids is kept in memory.
+    Vectors are read when they are requested, so proteins that are never
+    looked up are never loaded. Vectors that do not have `dimension` values
+    or contain NaN are treated as missing.
+
+    With `consolidate`, the vectors are copied once into one contiguous
+    float16 matrix (a .npy file) that is opened memory-mapped; later runs
+    can open that matrix directly with `from_matrix`.
+
+    Args:
+        path: path of the HDF5 file
+        ids: if given, only these ids are indexed
+        dimension: number of values of an embedding
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ids: Optional[Iterable[str]] = None,
+        dimension: int = PROTT5_EMBEDDING_DIMENSION,
+    ):
+        self.path = path
+        self.dimension = dimension
+        self.file = h5py.File(path, "r")
+        # the datasets are named by their UniProt id
+        keys = np.array(list(self.file.keys()), dtype=str)
+        if ids is not None:
+            keys = filter_ids(keys, ids)
+        self.index = set(keys.tolist())
+        # row per id when the vectors are read from a consolidated matrix
+        self.rows = None
+        self.matrix = None
+
+        logger.info(f"Indexed {len(self.index)} embeddings of {path}")
+
+    @classmethod
+    def from_matrix(cls, matrix_path: str, ids: Optional[Iterable[str]] = None) -> "EmbeddingStore":
+        """
+        Open a matrix written by `consolidate`, without the HDF5 file.
+        """
+        store = cls.__new__(cls)
+        store.path = matrix_path
+        store.file = None
+        store._open_matrix(matrix_path, ids)
+        store.dimension = store.matrix.shape[1]
+        logger.info(f"Opened {len(store.rows)} embeddings of {matrix_path}")
+        return store
+
+    @staticmethod
+    def ids_path(matrix_path: str) -> str:
+        return os.path.splitext(matrix_path)[0] + ".ids.txt"
+
+    def _open_matrix(self, matrix_path: str, ids: Optional[Iterable[str]] = None):
+        with open(self.ids_path(matrix_path), encoding="utf-8") as file:
+            text = file.read()
+        rows = {uniprot_id: row for row, uniprot_id in enumerate(text.split("\n") if text else [])}
+        if ids is not None:
+            rows = {uniprot_id: rows[uniprot_id] for uniprot_id in ids if uniprot_id in rows}
+        self.rows = rows
+        self.index = set(rows)
+        self.matrix = np.load(matrix_path, mmap_mode="r")
+
+    def _read(self, uniprot_id: str) -> Optional[np.ndarray]:
+        if self.matrix is not None:
+            return self.matrix[self.rows[uniprot_id]]
+
+        embedding = self.file[uniprot_id][()].astype(np.float16)
+        if embedding.shape != (self.dimension,) or np.isnan(embedding).any():
+            return None
+        return embedding
+
+    def get(self, uniprot_id: str, default=None) -> Optional[np.ndarray]:
+        if uniprot_id not in self.index:
+            return default
+        embedding = self._read(uniprot_id)
+        return default if embedding is None else embedding
+
+    def __getitem__(self, uniprot_id: str) -> np.ndarray:
+        embedding = self.get(uniprot_id)
+        if embedding is None:
+            raise KeyError(uniprot_id)
+        return embedding
+
+    def __contains__(self, uniprot_id: str) -> bool:
+        return uniprot_id in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self):
+        return iter(self.index)
+
+    def items(self):
+        for ids, block in self.blocks():
+            yield from zip(ids, block)
+
+    def blocks(self, block_size: int = EMBEDDING_BLOCK_SIZE):
+        """
+        Yield the valid vectors, sorted by id, as (ids, float16 matrix) blocks
+        of at most `block_size` rows. Vectors are read into one float32 block
+        and NaN values are detected with one array operation per block.
+        """
+        t0 = time()
+        ids = sorted(self.index)
+        count = 0
+        block = np.empty((block_size, self.dimension), dtype=np.float32)
+
+        for start in range(0, len(ids), block_size):
+            block_ids = ids[start : start + block_size]
+            if self.matrix is not None:
+                rows = [self.rows[uniprot_id] for uniprot_id in block_ids]
+                yield block_ids, self.matrix[rows]
+                count += len(block_ids)
+                continue
+
+            values = block[: len(block_ids)]
+            values.fill(np.nan)
+            for i, uniprot_id in enumerate(block_ids):
+                dataset = self.file[uniprot_id]
+                # vectors of another dimension stay NaN and are dropped
+                if dataset.shape == (self.dimension,):
+                    dataset.read_direct(values[i])
+            valid = ~np.isnan(values).any(axis=1)
+
+            yield (
+                [uniprot_id for uniprot_id, keep in zip(block_ids, valid.tolist()) if keep],
+                values[valid].astype(np.float16),
+            )
+            count += int(valid.sum())
+
+        duration = time() - t0
+        logger.info(
+            f"Read {count} of {len(ids)} embeddings in {round(duration, 2)} s "
+            f"({round(count / duration) if duration else count} vectors/s), "
+            f"peak RSS {peak_rss_mib()} MiB"
+        )
+
+    def _write_matrix(self, matrix_path: str) -> int:
+        """
+        Write the valid vectors as one float16 .npy matrix at `matrix_path`,
+        with the ids in a text file next to it (see `ids_path`), in blocks.
+        Return the number of vectors.
+        """
+        directory = os.path.dirname(matrix_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        ids = []
+        temporary_path = matrix_path + ".tmp.npy"
+        matrix = np.lib.format.open_memmap(
+            temporary_path, mode="w+", dtype=np.float16, shape=(len(self.index), self.dimension)
+        )
+        for block_ids, block in self.blocks():
+            matrix[len(ids) : len(ids) + len(block_ids)] = block
+            ids.extend(block_ids)
+        matrix.flush()
+        del matrix
+
+        if len(ids) < len(self.index):
+            # drop the rows of the invalid vectors
+            matrix = np.load(temporary_path, mmap_mode="r")[: len(ids)]
+            np.save(matrix_path + ".tmp2.npy", matrix)
+            del matrix
+            os.replace(matrix_path + ".tmp2.npy", temporary_path)
+
+        with open(self.ids_path(matrix_path), "w", encoding="utf-8") as file:
+            file.write("\n".join(ids))
+        os.replace(temporary_path, matrix_path)
+        return len(ids)
+
+    def consolidate(self, matrix_path: str):
+        """
+        Copy the valid vectors into one contiguous float16 matrix at
+        `matrix_path` (with the ids in a text file next to it), and read the
+        vectors from the memory-mapped matrix from then on.
+        """
+        if self.matrix is not None:
+            return
+
+        count = self._write_matrix(matrix_path)
+        logger.info(f"Consolidated {count} embeddings into {matrix_path}")
+
+        self.close()
+        self._open_matrix(matrix_path)
+
+    def export(self, matrix_path: str):
+        """
+        Write the valid vectors as one float16 .npy matrix keyed by the UniProt
+        ids in a text file next to it (see `ids_path`), in blocks. Unlike
+        `consolidate`, the store keeps reading its own source.
+        """
+        count = self._write_matrix(matrix_path)
+        logger.info(f"Exported {count} embeddings to {matrix_path}")
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+from biocypher._logger import logger
+from functools import lru_cache
+import re
+from typing import Union
+
+
+logger.debug(f"Loading module {__name__}.")
+
+# number of protein name strings of which the parsed names are cached
+PROTEIN_NAME_CACHE_SIZE = 2**16
+
+# the only characters the parser looks at, the text between them is skipped
+_PARENTHESES = re.compile(r"[()\[]")
+
+
+def parse_protein_names(field_value: str) -> Union[str, list[str]]:
+    """
+    Names of a UniProt "Protein names" value: the recommended name, followed
+    by alternative names in parentheses, e.g.
+
+        "Acetate kinase (EC 2.7.2.1) (Acetokinase)" -> ["Acetate kinase", "Acetokinase"]
+
+    Only top level parentheses that stand on their own (preceded by a space
+    and followed by a space or the end) enclose an alternative name, so
+    nested parentheses and parentheses inside a name, as in
+    "tRNA (guanine-N(1)-)-methyltransferase", stay part of the name. EC
+    numbers and "(Fragment)" are dropped, and so are the "[Cleaved into: ...]"
+    and "[Includes: ...]" parts. "|" and "'" are replaced for admin-import.
+
+    Values without nested parentheses are split on " (" at once, others are
+    parsed in a single pass over their parentheses and brackets.
+
+    Returns:
+        a list of names if the value has alternative names or EC numbers,
+        otherwise the name
+    """
+    field_value = field_value.replace("|", ",").replace("'", "^")
+
+    # without nested parentheses, splitting on " (" gives the groups
+    head = field_value.partition("[")[0] if "[" in field_value else field_value
+    if "(" not in head and ")" not in head:
+        return head.strip()
+    parts = head.split(" (")
+    count = len(parts) - 1
+    if head.count("(") == count and head.count(")") == count:
+        names = [parts[0].strip()]
+        has_groups = False
+        for part in parts[1:]:
+            group = part.rstrip()
+            if group[-1:] != ")":
+                break
+            if group.startswith("Fragm"):
+                continue
+            has_groups = True
+            name = group[:-1].strip()
+            if not name.startswith("EC"):
+                names.append(name)
+        else:
+            return names if has_groups else names[0]
+
+    names = []  # alternative names
+    has_groups = False  # alternative names or EC numbers
+    name_end = None  # end of the recommended name, at its first group
+    depth = 0
+    start = 0
+    last = 0  # end of the last group
+    end = length = len(field_value)
+    for match in _PARENTHESES.finditer(field_value):
+        i = match.start()
+        character = field_value[i]
+        if depth == 0:
+            if name_end is not None and (
+                character == ")" or field_value[last:i].strip()
+            ):
+                # text after the groups: they are part of the name
+                name_end, names, has_groups = None, [], False
+            if character == "[":
+                # "[Cleaved into: ...]" or "[Includes: ...]"
+                end = i
+                break
+            if character == "(":
+                start = i
+                depth = 1
+            continue
+
+        if character == "(":
+            depth += 1
+        elif character == ")":
+            depth -= 1
+            if depth > 0:
+                continue
+            last = i + 1
+            if (
+                start > 0
+                and field_value[start - 1] == " "
+                and (last == length or field_value[last] in " [")
+            ):
+                if name_end is None:
+                    name_end = start
+                group = field_value[start + 1 : i].strip()
+                if not group.startswith("Fragm"):
+                    has_groups = True
+                    if not group.startswith("EC"):
+                        names.append(group)
+            elif name_end is not None:
+                name_end, names, has_groups = None, [], False
+
+    if name_end is not None and field_value[last:end].strip():
+        name_end, names, has_groups = None, [], False
+
+    name = field_value[: end if name_end is None else name_end].strip()
+    if not has_groups:
+        return name
+    return [name, *names]
+
+
+@lru_cache(maxsize=PROTEIN_NAME_CACHE_SIZE)
+def parse_protein_names_cached(field_value: str) -> Union[str, tuple[str, ...]]:
+    """
+    `parse_protein_names` with an LRU cache, as names repeat across isoforms
+    and organisms. Lists are returned as tuples, so cached results can not
+    be changed by the caller.
+    """
+    names = parse_protein_names(field_value)
+    return names if isinstance(names, str) else tuple(names)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+from biocypher._logger import logger
+from collections.abc import Iterable, Iterator
+from hashlib import blake2b
+from typing import Literal, Optional
+import os
+import requests
+
+
+logger.debug(f"Loading module {__name__}.")
+
+UNIPROT_REST_URL = "https://rest.uniprot.org/uniprotkb/search"
+
+# number of entries per page of the UniProt REST API (at most 500)
+UNIPROT_PAGE_SIZE = 500
+
+# directory of the cached TSV responses
+UNIPROT_CACHE_DIRECTORY = os.path.join(".cache", "uniprot")
+
+
+def uniprot_query(
+    organism: Literal["*"] | int | None = "*", reviewed: Optional[bool] = True
+) -> str:
+    """
+    UniProtKB query of the entries of an organism ("*" or None for all).
+    Like `pypath.inputs.uniprot.uniprot_data`, `reviewed` restricts the
+    query to SwissProt (True), to TrEMBL (False), or covers both (None).
+    """
+    terms = []
+    if organism not in ("*", None):
+        terms.append(f"(organism_id:{organism})")
+    if reviewed is not None:
+        terms.append(f"(reviewed:{'true' if reviewed else 'false'})")
+    return " AND ".join(terms) or "*"
+
+
+def _cache_path(cache_directory: str, url: str, params: dict) -> str:
+    key = blake2b(
+        repr((url, sorted(params.items()))).encode(), digest_size=16
+    ).hexdigest()
+    return os.path.join(cache_directory, f"{key}.tsv")
+
+
+def fetch_uniprot_tsv(
+    fields: Iterable[str],
+    organism: Literal["*"] | int | None = "*",
+    reviewed: Optional[bool] = True,
+    url: str = UNIPROT_REST_URL,
+    page_size: int = UNIPROT_PAGE_SIZE,
+    cache_directory: Optional[str] = None,
+    session: Optional[requests.Session] = None,
+) -> Iterator[str]:
+    """
+    Yield the lines of the TSV of the accession and `fields` of all entries
+    of the query, following the pages of the UniProt REST API. The header
+    line of every page but the first is skipped.
+
+    With `cache_directory`, the TSV is saved there and read from there by
+    later calls with the same query and fields.
+    """
+    params = {
+        "query": uniprot_query(organism, reviewed),
+        "fields": ",".join(["accession", *fields]),
+        "format": "tsv",
+        "size": page_size,
+    }
+
+    if cache_directory:
+        path = _cache_path(cache_directory, url, params)
+        if os.path.isfile(path):
+            logger.info(f"Reading UniProt TSV from the cache: {path}")
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    yield line.rstrip("\n")
+            return
+
+        os.makedirs(cache_directory, exist_ok=True)
+        temporary_path = f"{path}.tmp{os.getpid()}"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            for line in fetch_uniprot_tsv(
+                fields, organism, reviewed, url, page_size, session=session
+            ):
+                file.write(line + "\n")
+                yield line
+        os.replace(temporary_path, path)
+        return
+
+    session = session or requests.Session()
+    next_url, next_params = url, params
+    header = True
+    pages = 0
+    while next_url:
+        with session.get(next_url, params=next_params, stream=True) as response:
+            response.raise_for_status()
+            lines = response.iter_lines(decode_unicode=True)
+            # every page starts with the header
+            first = next(lines, None)
+            if header and first is not None:
+                yield first
+                header = False
+            for line in lines:
+                if line:
+                    yield line
+            # the next page is in the Link header, with all parameters
+            next_url = response.links.get("next", {}).get("url")
+            next_params = None
+        pages += 1
+
+    logger.debug(f"Downloaded {pages} pages of UniProt TSV")
+
+
+def parse_uniprot_tsv(lines: Iterable[str], fields: list[str]) -> tuple[list[str], dict]:
+    """
+    Parse the TSV of `fetch_uniprot_tsv` in a single pass.
+
+    Returns:
+        the accessions, and per field a dict of the non-empty values by
+        accession (like `pypath.inputs.uniprot.uniprot_data`)
+    """
+    lines = iter(lines)
+    next(lines, None)  # header
+
+    accessions = []
+    data = {field: {} for field in fields}
+    columns = [data[field] for field in fields]
+    for line in lines:
+        accession, *values = line.split("\t")
+        accessions.append(accession)
+        for column, value in zip(columns, values):
+            value = value.strip()
+            if value:
+                column[accession] = value
+
+    return accessions, data
+
+
+def download_uniprot_fields(
+    fields: list[str],
+    organism: Literal["*"] | int | None = "*",
+    reviewed: Optional[bool] = True,
+    url: str = UNIPROT_REST_URL,
+    cache_directory: Optional[str] = None,
+) -> tuple[list[str], dict]:
+    """
+    Download `fields` of all entries of an organism with one paginated
+    multi-field query, see `parse_uniprot_tsv` for the result.
+
+    `pypath.inputs.uniprot.uniprot_data` takes several fields too, but it
+    drops the accession column, so the entries would take a second download
+    with `_all_uniprots`, and it reads from the URL and cache of pypath, for
+    which no fixture server or saved TSV can stand in.
+    """
+    return parse_uniprot_tsv(
+        fetch_uniprot_tsv(
+            fields, organism, reviewed, url, cache_directory=cache_directory
+        ),
+        fields,
+    )
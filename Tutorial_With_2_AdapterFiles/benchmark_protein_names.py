@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+Benchmark of the parsing of UniProt protein names: the `split(" (")` based
+`Uniprot._split_protein_names_field` used before, against the single pass
+`adapter.protein_names.parse_protein_names`, without and with its LRU cache.
+
+The values of protein_names_corpus.py, whose names are tested in
+tests/test_protein_names.py, start the synthetic names. The parser differs
+from the legacy parser where that one split names with parentheses (nested,
+or inside a name) and where it did not split the names in front of
+"[Cleaved into: ...]" or "[Includes: ...]". Besides the 9 values of
+`CHANGED` in the corpus, all synthetic names that differ are of the second
+kind.
+
+The adapter only uses the cache with `Uniprot(cache_protein_names=True)`: on
+a cold cache, the usual case of a single run, it is slower than the single
+pass, it pays off when the names are parsed again.
+
+Usage:
+    python benchmark_protein_names.py [uniprot_tsv]
+
+`uniprot_tsv` is a TSV of the UniProt REST API with the accession and the
+"protein_name" field as columns, e.g. a file of the `.cache/uniprot` directory
+written by `Uniprot.download_uniprot_data(cache=True)`. Without it, synthetic
+names of 20,400 entries are used.
+"""
+import random
+import sys
+from time import perf_counter
+from biocypher._logger import logger
+from adapter.protein_names import parse_protein_names, parse_protein_names_cached
+from adapter.uniprot_rest import parse_uniprot_tsv
+from protein_names_corpus import PROTEIN_NAMES
+
+# number of entries of the reviewed human proteome
+NUMBER_OF_ENTRIES = 20_400
+
+
+def split_protein_names_legacy(field_value):
+    """
+    `Uniprot._split_protein_names_field` before the single pass parser.
+    """
+    field_value = field_value.replace("|", ",").replace("'", "^")
+
+    if "[Cleaved" in field_value or "[Includes" in field_value:
+        clip = "[Cleaved" if "[Cleaved" in field_value else "[Includes"
+        return field_value[: field_value.index(clip)].replace("(Fragment)", "").strip()
+    elif "(EC" in field_value.replace("(Fragment)", ""):
+        return [
+            name.rstrip(")").strip()
+            for name in field_value.split(" (")
+            if not name.strip().startswith("EC") and not name.strip().startswith("Fragm")
+        ]
+    elif " (" in field_value.replace("(Fragment)", ""):
+        return [
+            name.rstrip(")").strip()
+            for name in field_value.split(" (")
+            if not name.strip().startswith("Fragm")
+        ]
+    return field_value.replace("(Fragment)", "").strip()
+
+
+def synthetic_names(number_of_entries, seed=0):
+    """
+    Protein names values like those of UniProt, with repeated names.
+    """
+    rng = random.Random(seed)
+    names = [value for value, _ in PROTEIN_NAMES]
+    for i in range(number_of_entries - len(names)):
+        value = f"Protein kinase {rng.randint(1, number_of_entries // 4)}"
+        for _ in range(rng.randint(0, 4)):
+            value += f" (Alternative name {rng.randint(1, 100)})"
+        if rng.random() < 0.3:
+            value += f" (EC 2.7.{rng.randint(1, 12)}.{rng.randint(1, 300)})"
+        if rng.random() < 0.05:
+            value += " (Fragment)"
+        if rng.random() < 0.05:
+            value += " [Cleaved into: Peptide 1; Peptide 2 (P2)]"
+        names.append(value)
+    return names
+
+
+def run(name, function, values, repeat=3, clear_cache=False):
+    best = None
+    for _ in range(repeat):
+        if clear_cache:
+            parse_protein_names_cached.cache_clear()
+        t0 = perf_counter()
+        result = [function(value) for value in values]
+        duration = perf_counter() - t0
+        best = duration if best is None else min(best, duration)
+    logger.info(f"{name}: {round(best, 3)} s ({round(len(values) / best)} names/s)")
+    return best, result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as file:
+            _, data = parse_uniprot_tsv(file.read().splitlines(), ["protein_name"])
+        values = list(data["protein_name"].values())
+    else:
+        values = synthetic_names(NUMBER_OF_ENTRIES)
+
+    logger.info(f"Parsing {len(values)} protein names: legacy vs single pass vs cached")
+    before, legacy = run("legacy", split_protein_names_legacy, values)
+    after, result = run("single pass", parse_protein_names, values)
+    cold, cached_result = run("cached, cold", parse_protein_names_cached, values, clear_cache=True)
+    assert [names if isinstance(names, str) else list(names) for names in cached_result] == result
+    # names parsed again, e.g. by a second adapter of the same process
+    warm, _ = run("cached, warm", parse_protein_names_cached, values)
+
+    changed = sum(old != new for old, new in zip(legacy, result))
+    logger.info(f"Names that differ from the legacy parser: {changed}")
+    logger.info(
+        f"Speedup: {round(before / after, 2)}x, cached {round(before / cold, 2)}x "
+        f"(cold) and {round(before / warm, 2)}x (warm)"
+    )
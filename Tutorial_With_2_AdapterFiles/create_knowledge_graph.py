@@ -153,9 +153,13 @@ if __name__ == "__main__":
     bc.write_edges(uniprot_edges)
 #
     if export_as_csv:
+        # the generators above are consumed by the writer, stream them again
         uniprot_adapter.export_data_to_csv(path=output_dir_path,
-                                        node_data=uniprot_nodes,
-                                        edge_data=uniprot_edges)
+                                        node_data=uniprot_adapter.get_nodes(),
+                                        edge_data=uniprot_adapter.get_edges())
+        # embeddings as a float16 matrix keyed by UniProt id, next to the csv files
+        if UniprotNodeField.PROTT5_EMBEDDING in uniprot_node_fields:
+            uniprot_adapter.export_prott5_embeddings(output_dir_path + "prott5_embeddings.npy")
  
 
 
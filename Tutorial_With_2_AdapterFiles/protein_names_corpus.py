@@ -0,0 +1,53 @@
+"""
+Protein names values of UniProt and the names that
+`adapter.protein_names.parse_protein_names` gives for them, tested in
+tests/test_protein_names.py and used as seeds of the synthetic names of
+benchmark_protein_names.py.
+"""
+
+# protein names value -> names, the same as with the split(" (") parser used
+# before `parse_protein_names`
+UNCHANGED = [
+    ("Acetate kinase (EC 2.7.2.1) (Acetokinase)", ["Acetate kinase", "Acetokinase"]),
+    ("Hemoglobin subunit alpha", "Hemoglobin subunit alpha"),
+    ("Hemoglobin subunit alpha (Alpha-globin) (Hemoglobin alpha chain)", ["Hemoglobin subunit alpha", "Alpha-globin", "Hemoglobin alpha chain"]),
+    ("Cellular tumor antigen p53 (Antigen NY-CO-13) (Phosphoprotein p53) (Tumor suppressor p53)", ["Cellular tumor antigen p53", "Antigen NY-CO-13", "Phosphoprotein p53", "Tumor suppressor p53"]),
+    ("Serine/threonine-protein kinase B-raf (EC 2.7.11.1) (Proto-oncogene B-Raf) (p94) (v-Raf murine sarcoma viral oncogene homolog B1)", ["Serine/threonine-protein kinase B-raf", "Proto-oncogene B-Raf", "p94", "v-Raf murine sarcoma viral oncogene homolog B1"]),
+    ("Carbonic anhydrase 2 (EC 4.2.1.1) (EC 4.2.1.69)", ["Carbonic anhydrase 2"]),
+    ("Uncharacterized protein (Fragment)", "Uncharacterized protein"),
+    ("Immunoglobulin heavy variable 3-23 (Fragment) (Ig heavy chain V-III region)", ["Immunoglobulin heavy variable 3-23", "Ig heavy chain V-III region"]),
+    ("Protein FAM3A | isoform 1", "Protein FAM3A , isoform 1"),
+    ("5'-nucleotidase (5'-NT) (EC 3.1.3.5)", ["5^-nucleotidase", "5^-NT"]),
+    ("Insulin [Cleaved into: Insulin B chain; Insulin A chain]", "Insulin"),
+    ("CAD protein [Includes: Glutamine-dependent carbamoyl-phosphate synthase (EC 6.3.5.5); Aspartate carbamoyltransferase (EC 2.1.3.2)]", "CAD protein"),
+]
+
+# protein names value -> names, that the split(" (") parser gave other
+# names for (in the comments)
+CHANGED = [
+    # "[Cleaved into: ...]" and "[Includes: ...]" are dropped, and the names
+    # in front of them are split like in other values
+    # legacy: "Amyloid-beta precursor protein (APP) (ABPP) (Alzheimer disease amyloid protein)"
+    ("Amyloid-beta precursor protein (APP) (ABPP) (Alzheimer disease amyloid protein) [Cleaved into: N-APP; Amyloid-beta protein 42 (Abeta42)]", ["Amyloid-beta precursor protein", "APP", "ABPP", "Alzheimer disease amyloid protein"]),
+    # legacy: "Complement C3 (C3 and PZP-like alpha-2-macroglobulin domain-containing protein 1)"
+    ("Complement C3 (C3 and PZP-like alpha-2-macroglobulin domain-containing protein 1) [Cleaved into: Complement C3 beta chain]", ["Complement C3", "C3 and PZP-like alpha-2-macroglobulin domain-containing protein 1"]),
+    # legacy: "Bifunctional glutamate/proline--tRNA ligase (Bifunctional aminoacyl-tRNA synthetase)"
+    ("Bifunctional glutamate/proline--tRNA ligase (Bifunctional aminoacyl-tRNA synthetase) [Includes: Glutamate--tRNA ligase (EC 6.1.1.17); Proline--tRNA ligase (EC 6.1.1.15)]", ["Bifunctional glutamate/proline--tRNA ligase", "Bifunctional aminoacyl-tRNA synthetase"]),
+    # legacy: "Fatty acid synthase (EC 2.3.1.85)"
+    ("Fatty acid synthase (EC 2.3.1.85) (Fragment) [Includes: [Acyl-carrier-protein] S-acetyltransferase (EC 2.3.1.38)]", ["Fatty acid synthase"]),
+    # parentheses inside a name are part of the name
+    # legacy: ["tRNA", "guanine-N(1)-)-methyltransferase", "M1G-methyltransferase"]
+    ("tRNA (guanine-N(1)-)-methyltransferase (EC 2.1.1.228) (M1G-methyltransferase)", ["tRNA (guanine-N(1)-)-methyltransferase", "M1G-methyltransferase"]),
+    # legacy: ["tRNA", "adenine(58)-N(1))-methyltransferase non-catalytic subunit TRM6"]
+    ("tRNA (adenine(58)-N(1))-methyltransferase non-catalytic subunit TRM6", "tRNA (adenine(58)-N(1))-methyltransferase non-catalytic subunit TRM6"),
+    # legacy: ["Protein-lysine N-methyltransferase EEF2KMT", "Protein-lysine methyltransferase", "FAM86A"]
+    ("Protein-lysine N-methyltransferase EEF2KMT (EC 2.1.1.-) (Protein-lysine methyltransferase (FAM86A))", ["Protein-lysine N-methyltransferase EEF2KMT", "Protein-lysine methyltransferase (FAM86A)"]),
+    # groups followed by more text are part of the name
+    # legacy: ["Cytochrome c oxidase subunit 2", "Cytochrome c oxidase polypeptide II"]
+    ("Cytochrome c oxidase subunit 2 (Cytochrome c oxidase polypeptide II) (Fragment) tail", "Cytochrome c oxidase subunit 2 (Cytochrome c oxidase polypeptide II) (Fragment) tail"),
+    # "(Fragments)" alone gives a name, like "(Fragment)"
+    # legacy: ["T cell receptor beta variable 5-1"]
+    ("T cell receptor beta variable 5-1 (Fragments)", "T cell receptor beta variable 5-1"),
+]
+
+PROTEIN_NAMES = UNCHANGED + CHANGED
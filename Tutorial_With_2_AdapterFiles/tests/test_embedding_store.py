@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+import h5py
+import numpy as np
+import psutil
+import pytest
+from adapter import embedding_store
+from adapter.embedding_store import EmbeddingStore, peak_rss_mib
+
+
+@pytest.fixture
+def embeddings_path(tmp_path):
+    path = tmp_path / "per-protein.h5"
+    with h5py.File(path, "w") as file:
+        for i in range(5):
+            file[f"P{i}"] = np.full(1024, i, dtype=np.float32)
+        # invalid vectors are not exported
+        file["P5"] = np.full(1024, np.nan, dtype=np.float32)
+        file["P6"] = np.zeros(10, dtype=np.float32)
+    return str(path)
+
+
+def test_export_keeps_reading_the_source(embeddings_path, tmp_path):
+    store = EmbeddingStore(embeddings_path)
+    matrix_path = str(tmp_path / "export" / "prott5_embeddings.npy")
+    store.export(matrix_path)
+
+    assert store.matrix is None and store.file is not None
+    with open(EmbeddingStore.ids_path(matrix_path)) as file:
+        assert file.read().split("\n") == ["P0", "P1", "P2", "P3", "P4"]
+    matrix = np.load(matrix_path)
+    assert matrix.dtype == np.float16 and matrix.shape == (5, 1024)
+    assert (matrix[:, 0] == np.arange(5)).all()
+
+
+def test_export_of_a_consolidated_store(embeddings_path, tmp_path):
+    store = EmbeddingStore(embeddings_path)
+    consolidated_path = str(tmp_path / "consolidated.npy")
+    store.consolidate(consolidated_path)
+    matrix_path = str(tmp_path / "export.npy")
+    store.export(matrix_path)
+
+    assert store.matrix.filename == consolidated_path
+    assert (np.load(matrix_path) == np.load(consolidated_path)).all()
+
+
+@pytest.mark.parametrize("platform,ru_maxrss", [("linux", 2**20), ("darwin", 2**30)])
+def test_peak_rss_units(monkeypatch, platform, ru_maxrss):
+    rusage = SimpleNamespace(ru_maxrss=ru_maxrss)
+    monkeypatch.setattr(embedding_store.sys, "platform", platform)
+    monkeypatch.setattr(
+        embedding_store,
+        "resource",
+        SimpleNamespace(RUSAGE_SELF=0, getrusage=lambda who: rusage),
+    )
+    assert peak_rss_mib() == 1024.0
+
+
+def test_peak_rss_without_resource(monkeypatch):
+    monkeypatch.setattr(embedding_store, "resource", None)
+    rss = psutil.Process().memory_info().rss / 2**20
+    assert rss - 1 <= peak_rss_mib() <= rss + 64
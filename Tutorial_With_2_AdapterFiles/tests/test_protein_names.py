@@ -0,0 +1,15 @@
+import pytest
+from adapter.protein_names import parse_protein_names, parse_protein_names_cached
+from protein_names_corpus import PROTEIN_NAMES
+
+
+@pytest.mark.parametrize("value,names", PROTEIN_NAMES)
+def test_parse_protein_names(value, names):
+    assert parse_protein_names(value) == names
+
+
+@pytest.mark.parametrize("value,names", PROTEIN_NAMES)
+def test_parse_protein_names_cached(value, names):
+    cached = parse_protein_names_cached(value)
+    assert cached == (names if isinstance(names, str) else tuple(names))
+    assert parse_protein_names_cached(value) is cached
@@ -0,0 +1,69 @@
+import time
+from functools import partial
+import pytest
+from pypath.share import settings
+from adapter.Uniprot_adapter import Uniprot, UniprotNodeField
+
+
+@pytest.fixture
+def uniprot():
+    return Uniprot(
+        organism=9606,
+        node_fields=[UniprotNodeField.LENGTH, UniprotNodeField.MASS],
+        curie_index_path=None,
+    )
+
+
+def fake_download(name, delay):
+    """
+    Download of a field that returns after `delay` seconds, so that the
+    downloads of the pool complete in another order than they started.
+    """
+    time.sleep(delay)
+    return {f"P{i:05d}": f"{name} {i}" for i in range(100)}
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_parallel_downloads_match_the_sequential_path(uniprot, workers):
+    downloads = {
+        name: partial(fake_download, name, delay)
+        for name, delay in (
+            ("length", 0.2),
+            ("mass", 0.0),
+            ("gene_names", 0.1),
+            ("subcellular_location", 0.05),
+        )
+    }
+    sequential = {name: download() for name, download in downloads.items()}
+
+    results = uniprot._run_downloads(downloads, retries=3, workers=workers)
+
+    assert results == sequential
+    assert list(results) == list(downloads)
+
+
+def test_downloads_retry_once_per_attempt(uniprot):
+    attempts = []
+
+    def flaky_download():
+        # the workers retry, every attempt is a single pypath request
+        attempts.append(settings.get("curl_retries"))
+        if len(attempts) < 2:
+            raise OSError("connection reset")
+        return {"P00001": "1"}
+
+    def failing_download():
+        raise OSError("connection reset")
+
+    results = uniprot._run_downloads({"length": flaky_download}, retries=3, workers=2)
+    assert results == {"length": {"P00001": "1"}}
+    assert attempts == [1, 1]
+
+    calls = []
+    with pytest.raises(OSError):
+        uniprot._run_downloads(
+            {"mass": lambda: calls.append(1) or failing_download()},
+            retries=3,
+            workers=2,
+        )
+    assert len(calls) == 3
@@ -0,0 +1,127 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+import pytest
+from adapter.uniprot_rest import (
+    fetch_uniprot_tsv,
+    parse_uniprot_tsv,
+    uniprot_query,
+)
+
+HEADER = "Entry\tLength\tGene Names"
+
+# pages of the fixture server by cursor, every page starts with the header
+PAGES = {
+    None: [HEADER, "P00001\t100\tGENE1 GENE2", "P00002\t200\t"],
+    "2": [HEADER, "P00003\t300\tGENE3"],
+    "3": [HEADER, "P00004\t400\tGENE4 GENE5"],
+}
+NEXT_CURSOR = {None: "2", "2": "3"}
+
+
+@pytest.fixture
+def uniprot_server():
+    """
+    Fixture server of the UniProt REST search, with the next page in the
+    Link header. Yields its URL and the query parameters of every request.
+    """
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            requests.append(params)
+            cursor = params.get("cursor")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; format=tsv")
+            if cursor in NEXT_CURSOR:
+                next_params = urlencode({**params, "cursor": NEXT_CURSOR[cursor]})
+                next_url = f"{server_url}?{next_params}"
+                self.send_header("Link", f'<{next_url}>; rel="next"')
+            self.end_headers()
+            self.wfile.write(("\n".join(PAGES[cursor]) + "\n").encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server_url = f"http://127.0.0.1:{server.server_port}/search"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server_url, requests
+    server.shutdown()
+    server.server_close()
+
+
+def expected_lines():
+    return [HEADER] + [line for page in PAGES.values() for line in page[1:]]
+
+
+@pytest.mark.parametrize(
+    "organism,reviewed,query",
+    [
+        (9606, True, "(organism_id:9606) AND (reviewed:true)"),
+        (9606, False, "(organism_id:9606) AND (reviewed:false)"),
+        (9606, None, "(organism_id:9606)"),
+        ("*", False, "(reviewed:false)"),
+        ("*", None, "*"),
+    ],
+)
+def test_uniprot_query(organism, reviewed, query):
+    assert uniprot_query(organism, reviewed) == query
+
+
+def test_fetch_follows_the_pages(uniprot_server):
+    url, requests = uniprot_server
+    lines = list(
+        fetch_uniprot_tsv(["length", "gene_names"], 9606, False, url=url, page_size=2)
+    )
+
+    assert lines == expected_lines()
+    assert len(requests) == 3
+    assert requests[0] == {
+        "query": "(organism_id:9606) AND (reviewed:false)",
+        "fields": "accession,length,gene_names",
+        "format": "tsv",
+        "size": "2",
+    }
+    assert [request.get("cursor") for request in requests] == [None, "2", "3"]
+
+
+def test_fetch_from_the_cache(uniprot_server, tmp_path):
+    url, requests = uniprot_server
+    cache_directory = str(tmp_path / "uniprot")
+
+    fetched = list(fetch_uniprot_tsv(["length"], url=url, cache_directory=cache_directory))
+    assert len(requests) == 3
+    assert os.listdir(cache_directory) and all(
+        name.endswith(".tsv") for name in os.listdir(cache_directory)
+    )
+
+    cached = list(fetch_uniprot_tsv(["length"], url=url, cache_directory=cache_directory))
+    assert cached == fetched == expected_lines()
+    assert len(requests) == 3
+
+    # other fields are another query
+    list(fetch_uniprot_tsv(["gene_names"], url=url, cache_directory=cache_directory))
+    assert len(requests) == 6
+    assert len(os.listdir(cache_directory)) == 2
+
+
+def test_parse_uniprot_tsv():
+    lines = [
+        "Entry\tLength\tGene Names",
+        "P00001\t100\tGENE1 GENE2",
+        "P00002\t200\t",
+        "P00003\t \tGENE3\n",
+    ]
+    accessions, data = parse_uniprot_tsv(lines, ["length", "gene_names"])
+
+    assert accessions == ["P00001", "P00002", "P00003"]
+    assert data == {
+        "length": {"P00001": "100", "P00002": "200"},
+        "gene_names": {"P00001": "GENE1 GENE2", "P00003": "GENE3"},
+    }